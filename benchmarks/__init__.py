@@ -0,0 +1 @@
+"""Benchmarks for the world clock bot's hot paths."""
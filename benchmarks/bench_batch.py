@@ -0,0 +1,60 @@
+"""Compares the per-row pytz render loop against the tzbatch vectorized path.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch
+"""
+from datetime import datetime
+import time
+import pytz
+import timefmt
+import tzbatch
+import tzengine
+from benchmarks.synthetic import synthetic_rows
+
+ROW_COUNTS = (10, 1000, 100000)
+
+def render_per_row(rows):
+    """The original display_timezones loop: one pytz conversion and two strftime calls per row."""
+    message = "```"
+    for label, tz in rows:
+        tz_info = pytz.timezone(tz)
+        utc_time = datetime.now(pytz.utc)
+        local_time = utc_time.astimezone(tz_info)
+        date = local_time.strftime('%m/%d')
+        time_str = local_time.strftime('%I:%M %p')
+        message += f"{label:<20} | {date:<7} | {time_str}\n"
+    return message + "```"
+
+def render_batched(rows, instant):
+    """The tzbatch path used by the refresh loop for large boards."""
+    result = tzbatch.convert([tz for _, tz in rows], instant)
+    dates, minutes = tzbatch.table_indices(result)
+    parts = [
+        f"{label:<20} | {timefmt.MONTH_DAY[date]:<7} | {timefmt.TIME_12H[minute]}\n"
+        for (label, _), date, minute in zip(rows, dates, minutes)
+    ]
+    return "```" + "".join(parts) + "```"
+
+def best_of(func, repeat):
+    """Returns the fastest of repeat timed calls to func, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    instant = tzengine.now()
+    print(f"{'rows':>8} | {'per-row':>10} | {'batched':>10} | speedup")
+    for count in ROW_COUNTS:
+        rows = synthetic_rows(count)
+        repeat = 5 if count < 100000 else 1
+        render_batched(rows, instant)  # Build the transition matrix outside the timing
+        per_row = best_of(lambda: render_per_row(rows), repeat)
+        batched = best_of(lambda: render_batched(rows, instant), repeat)
+        print(f"{count:>8} | {per_row * 1000:>8.2f}ms | {batched * 1000:>8.2f}ms | {per_row / batched:.1f}x")
+
+if __name__ == "__main__":
+    main()
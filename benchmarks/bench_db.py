@@ -0,0 +1,85 @@
+"""Compares command latency with a connection per command against the shared storage.Database.
+
+Simulates concurrent users running addtimezone / listtimezones / currenttime /
+removetimezone against a scratch database. Run from the repository root:
+
+    python -m benchmarks.bench_db
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import aiosqlite
+import storage
+
+CONCURRENCY = 50
+COMMANDS_PER_USER = 40
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS timezones (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        label TEXT NOT NULL,
+        timezone TEXT NOT NULL
+    )
+'''
+
+class ConnectPerCommand:
+    """The original access pattern: every command opens and closes its own connection."""
+
+    def __init__(self, path):
+        self.path = path
+
+    async def execute(self, sql, params=()):
+        async with aiosqlite.connect(self.path) as db:
+            await db.execute(sql, params)
+            await db.commit()
+
+    async def fetchall(self, sql, params=()):
+        async with aiosqlite.connect(self.path) as db:
+            cursor = await db.execute(sql, params)
+            return await cursor.fetchall()
+
+async def user(db, user_id, latencies):
+    """Runs a mix of commands as one user, recording each command's latency."""
+    for i in range(COMMANDS_PER_USER):
+        label = f"user{user_id}-{i}"
+        start = time.perf_counter()
+        if i % 4 == 0:
+            await db.execute("INSERT INTO timezones (label, timezone) VALUES (?, ?)", (label, 'Europe/London'))
+        elif i % 4 == 3:
+            await db.execute("DELETE FROM timezones WHERE label = ?", (f"user{user_id}-{i - 3}",))
+        else:
+            await db.fetchall("SELECT label, timezone FROM timezones")
+        latencies.append(time.perf_counter() - start)
+
+async def run(db):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(user(db, u, latencies) for u in range(CONCURRENCY)))
+    return latencies, time.perf_counter() - start
+
+def report(name, latencies, elapsed):
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{name:<20} | {len(latencies) / elapsed:>8.0f} cmd/s | p50 {p50:>7.2f}ms | p99 {p99:>7.2f}ms")
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        async with aiosqlite.connect(path) as db:
+            await db.execute(SCHEMA)
+            await db.commit()
+
+        report("connect per command", *await run(ConnectPerCommand(path)))
+
+        database = storage.Database(path)
+        await database.open()
+        try:
+            report("storage.Database", *await run(database))
+        finally:
+            await database.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
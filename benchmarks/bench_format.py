@@ -0,0 +1,58 @@
+"""Measures the per-row cost of rendering clock rows at 10k rows.
+
+Compares strftime on a datetime per row against the timefmt lookup tables.
+Run from the repository root:
+
+    python -m benchmarks.bench_format
+"""
+from datetime import datetime, timedelta
+import time
+import timefmt
+import tzengine
+from benchmarks.synthetic import synthetic_rows
+
+ROWS = 10000
+REPEAT = 5
+
+EPOCH = datetime(1970, 1, 1)
+
+def render_strftime(rows, instant):
+    """Rows built from a datetime and two strftime calls each."""
+    parts = []
+    for label, tz in rows:
+        local_time = EPOCH + timedelta(seconds=instant + tzengine.offset_at(tz, instant))
+        date = local_time.strftime('%m/%d')
+        time_str = local_time.strftime('%I:%M %p')
+        parts.append(f"{label:<20} | {date:<7} | {time_str}\n")
+    return "".join(parts)
+
+def render_tables(rows, instant):
+    """Rows assembled from the precomputed timefmt fragments."""
+    offset = tzengine.offset_cache.offset
+    parts = []
+    for label, tz in rows:
+        days, seconds = divmod(instant + offset(tz, instant), 86400)
+        parts.append(timefmt.clock_row_parts(label, timefmt.date_index(days), seconds // 60))
+    return "".join(parts)
+
+def per_row_us(func, rows, instant):
+    """Returns the best per-row time of func over REPEAT runs, in microseconds."""
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(rows, instant)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows) * 1e6
+
+def main():
+    rows = synthetic_rows(ROWS)
+    instant = tzengine.now()
+    assert render_strftime(rows, instant) == render_tables(rows, instant)
+    strftime_cost = per_row_us(render_strftime, rows, instant)
+    tables_cost = per_row_us(render_tables, rows, instant)
+    print(f"{ROWS} rows")
+    print(f"strftime per row | {strftime_cost:.3f}us")
+    print(f"tables per row   | {tables_cost:.3f}us ({strftime_cost / tables_cost:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Compares memory and estimated gateway event volume of the default and lean client profiles per 1k guilds.
+
+Each profile runs in its own process so resident memory is not shared. The
+process builds a discord.py client with the profile's options, feeds its
+connection state synthetic GUILD_CREATE payloads for 1000 guilds and one
+minute of synthetic MESSAGE_CREATE traffic, and reports what the client
+retained. Gateway volume is an estimate, not a measurement: it counts
+the events of an assumed one-minute activity mix that Discord would
+deliver for the profile's intents. No connection to Discord is made. Run from the repository root:
+
+    python -m benchmarks.bench_profile
+"""
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tracemalloc
+import discord
+import profiles
+
+GUILDS = 1000
+CHANNELS_PER_GUILD = 20
+ROLES_PER_GUILD = 10
+MEMBERS_PER_GUILD = 50  # Members Discord includes in GUILD_CREATE (voice members, the bot, ...)
+BOT_ID = 1
+
+# (profile, prefix_commands) pairs measured; the last is the lean profile with only slash commands
+CONFIGURATIONS = (
+    (profiles.DEFAULT_PROFILE, True),
+    (profiles.LEAN_PROFILE, True),
+    (profiles.LEAN_PROFILE, False),
+)
+
+# Assumed events per guild per minute in a moderately active guild, and the intent that delivers each
+ACTIVITY = {
+    'MESSAGE_CREATE': (20, 'guild_messages'),
+    'MESSAGE_UPDATE': (2, 'guild_messages'),
+    'MESSAGE_DELETE': (1, 'guild_messages'),
+    'TYPING_START': (15, 'guild_typing'),
+    'MESSAGE_REACTION_ADD': (5, 'guild_reactions'),
+    'VOICE_STATE_UPDATE': (2, 'voice_states'),
+    'GUILD_MEMBER_UPDATE': (1, 'members'),
+    'PRESENCE_UPDATE': (30, 'presences'),
+    'CHANNEL_UPDATE': (0.1, 'guilds'),
+    'GUILD_EMOJIS_UPDATE': (0.01, 'emojis_and_stickers'),
+    'INVITE_CREATE': (0.05, 'invites'),
+}
+
+def user(user_id):
+    return {'id': str(user_id), 'username': f"user{user_id}", 'discriminator': '0', 'avatar': None}
+
+def guild_payload(guild_id):
+    """A GUILD_CREATE payload shaped like Discord's, with synthetic channels, roles and members."""
+    base = guild_id * 10_000
+    return {
+        'id': str(guild_id),
+        'name': f"guild{guild_id}",
+        'owner_id': str(base + 100),
+        'unavailable': False,
+        'member_count': 500,
+        'features': [],
+        'emojis': [],
+        'stickers': [],
+        'roles': [
+            {'id': str(base + r + 1 if r else guild_id), 'name': f"role{r}", 'permissions': '0', 'position': r,
+             'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}
+            for r in range(ROLES_PER_GUILD)
+        ],
+        'channels': [
+            {'id': str(base + 1000 + c), 'type': 0, 'name': f"channel{c}", 'position': c,
+             'permission_overwrites': [], 'guild_id': str(guild_id)}
+            for c in range(CHANNELS_PER_GUILD)
+        ],
+        'members': [
+            {'user': user(BOT_ID if m == 0 else base + 100 + m), 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00',
+             'deaf': False, 'mute': False, 'flags': 0}
+            for m in range(MEMBERS_PER_GUILD)
+        ],
+        'voice_states': [],
+        'presences': [],
+        'threads': [],
+        'stage_instances': [],
+        'guild_scheduled_events': [],
+    }
+
+def message_payload(guild_id, index):
+    base = guild_id * 10_000
+    author = base + 101 + index % (MEMBERS_PER_GUILD - 1)
+    return {
+        'id': str(guild_id * 1_000_000 + index),
+        'channel_id': str(base + 1000 + index % CHANNELS_PER_GUILD),
+        'guild_id': str(guild_id),
+        'author': user(author),
+        'member': {'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0},
+        'content': f"message {index} in guild {guild_id}",
+        'timestamp': '2024-01-01T00:00:00+00:00',
+        'edited_timestamp': None,
+        'tts': False,
+        'mention_everyone': False,
+        'mentions': [],
+        'mention_roles': [],
+        'attachments': [],
+        'embeds': [],
+        'pinned': False,
+        'type': 0,
+    }
+
+def gateway_volume(intents):
+    """Returns the estimated events per minute, and their names, that Discord delivers to 1k guilds for intents."""
+    delivered = {
+        event: rate * GUILDS
+        for event, (rate, intent) in ACTIVITY.items()
+        if getattr(intents, intent)
+    }
+    return sum(delivered.values()), sorted(delivered)
+
+async def measure(profile, prefix_commands):
+    """Loads the synthetic guilds and traffic into a client built for profile and reports its footprint."""
+    tracemalloc.start()
+    options = profiles.client_options(profile, prefix_commands)
+    client = discord.Client(**options)
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=user(BOT_ID) | {'bot': True})
+
+    for guild_id in range(1, GUILDS + 1):
+        state.parse_guild_create(guild_payload(guild_id))
+    messages, _ = ACTIVITY['MESSAGE_CREATE']
+    if options['intents'].guild_messages:
+        for guild_id in range(1, GUILDS + 1):
+            for index in range(messages):
+                state.parse_message_create(message_payload(guild_id, index))
+    await asyncio.sleep(0)
+
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    events, names = gateway_volume(options['intents'])
+    return {
+        'profile': profile,
+        'prefix_commands': prefix_commands,
+        'guilds': len(state._guilds),
+        'cached_members': sum(len(guild._members) for guild in state._guilds.values()),
+        'cached_messages': len(state._messages or ()),
+        'retained_mb': round(current / 1e6, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'estimated_gateway_events_per_min': round(events),
+        'gateway_events': names,
+    }
+
+def main():
+    if len(sys.argv) > 1:
+        print(json.dumps(asyncio.run(measure(sys.argv[1], sys.argv[2] == '1'))))
+        return
+    for profile, prefix_commands in CONFIGURATIONS:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_profile', profile, '1' if prefix_commands else '0'],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output)
+        name = profile if prefix_commands else f"{profile}, slash only"
+        print(
+            f"{name:<17} | {result['retained_mb']:>7.2f} MB retained | {result['peak_rss_mb']:>7.1f} MB peak RSS"
+            f" | {result['cached_members']:>6} members | {result['cached_messages']:>5} messages"
+            f" | {result['estimated_gateway_events_per_min']:>6} events/min per {GUILDS} guilds (estimated)"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Compares per-tick CPU and edit spread of 100k boards refreshed every minute.
+
+The old scheduler, a heap per kind with every board due at the minute
+boundary, is compared against boards.BoardRegistry's timer wheel with
+per-board jitter. Both are driven by one tick per second for three minutes;
+each due board is rescheduled for the next minute as the refresh loop does.
+Run from the repository root:
+
+    python -m benchmarks.bench_wheel
+"""
+import heapq
+import itertools
+import statistics
+import time
+import boards
+import timerwheel
+from benchmarks.synthetic import synthetic_boards
+
+BOARDS = 100_000
+MINUTES = 3
+SPREADS = (20, 60)
+
+class HeapScheduler:
+    """The previous registry's scheduling: a heap of (next_due, seq, message_id) with lazy deletion."""
+
+    def __init__(self, start, board_list):
+        self._seq = itertools.count()
+        self._queue = [(start, next(self._seq), board.message_id) for board in board_list]
+        self._boards = {board.message_id: board for board in board_list}
+        for board in board_list:
+            board.next_due = start
+        heapq.heapify(self._queue)
+
+    def schedule(self, board, next_due):
+        board.next_due = next_due
+        heapq.heappush(self._queue, (next_due, next(self._seq), board.message_id))
+
+    def pop_due(self, kind, instant):
+        due = {}
+        while self._queue and self._queue[0][0] <= instant:
+            next_due, _, message_id = heapq.heappop(self._queue)
+            board = self._boards.get(message_id)
+            if board is not None and board.next_due == next_due:
+                due[message_id] = board
+        return list(due.values())
+
+def drive(scheduler, start):
+    """Ticks the scheduler once a second, returning the CPU time of each tick and boards handed out."""
+    tick_times = []
+    handed_out = []
+    for instant in range(start, start + MINUTES * 60):
+        begin = time.perf_counter()
+        due = scheduler.pop_due(boards.WORLD_CLOCK, instant)
+        next_minute = (instant // 60 + 1) * 60
+        for board in due:
+            scheduler.schedule(board, next_minute)
+        tick_times.append(time.perf_counter() - begin)
+        handed_out.append(len(due))
+    # The first minute only drains the boards loaded at start
+    return tick_times[60:], handed_out[60:]
+
+def report(name, tick_times, handed_out):
+    tick_times = sorted(tick_times)
+    p50 = statistics.median(tick_times) * 1000
+    p99 = tick_times[int(len(tick_times) * 0.99) - 1] * 1000
+    busy = sum(1 for count in handed_out if count)
+    print(
+        f"{name:<18} | tick p50 {p50:>7.2f}ms p99 {p99:>7.2f}ms max {tick_times[-1] * 1000:>7.2f}ms"
+        f" | edits/s max {max(handed_out):>6} | busy seconds/min {busy * 60 // len(handed_out):>2}"
+    )
+
+def bench_operations():
+    """Times schedule and cancel on a wheel already holding BOARDS timers."""
+    start = 1_700_000_040
+    wheel = timerwheel.TimerWheel(start)
+    for key in range(BOARDS):
+        wheel.schedule(key, start + key % 100_000)
+    begin = time.perf_counter()
+    for key in range(BOARDS):
+        wheel.schedule(key, start + 60 + key % 7)
+    schedule = (time.perf_counter() - begin) / BOARDS * 1e6
+    begin = time.perf_counter()
+    for key in range(BOARDS):
+        wheel.cancel(key)
+    cancel = (time.perf_counter() - begin) / BOARDS * 1e6
+    print(f"wheel with {BOARDS} timers: schedule {schedule:.2f}us, cancel {cancel:.2f}us")
+
+def main():
+    start = 1_700_000_040  # A minute boundary
+    report("heap, no jitter", *drive(HeapScheduler(start, synthetic_boards(BOARDS)), start))
+    for spread in SPREADS:
+        registry = boards.BoardRegistry(offset=1, spread=spread)
+        registry._wheels = {kind: timerwheel.TimerWheel(start) for kind in boards.BOARD_KINDS}
+        for board in synthetic_boards(BOARDS):
+            board.next_due = start
+            registry.add(board, start)
+        registry.take_changes()
+        report(f"wheel, spread {spread}s", *drive(registry, start))
+    bench_operations()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+"""A local stand-in for Discord's gateway and REST API, for load testing the bot offline.
+
+Implements what the bot uses: the gateway handshake (HELLO, IDENTIFY,
+READY, GUILD_CREATE, heartbeats and RESUME, with optional zlib-stream
+compression), MESSAGE_CREATE/UPDATE/DELETE dispatch, and the REST routes for
+logging in, finding the gateway and creating, fetching, editing and
+deleting channel messages. Responses carry Discord's rate-limit headers;
+requests over a channel's or the global limit get a 429 shaped like
+Discord's. Point discord.py at it by setting discord.http.Route.BASE to
+FakeDiscord.api_base and discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY
+to FakeDiscord.gateway_url. See benchmarks/load_test.py for a driver.
+"""
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+import asyncio
+import itertools
+import json
+import math
+import time
+import uuid
+import zlib
+from aiohttp import web, WSMsgType
+
+API_VERSION = 10
+
+# Gateway opcodes
+DISPATCH = 0
+HEARTBEAT = 1
+IDENTIFY = 2
+RESUME = 6
+HELLO = 10
+HEARTBEAT_ACK = 11
+
+HEARTBEAT_INTERVAL_MS = 41250
+
+# Discord's message limits: 5 requests per 5 seconds per channel and route, 50 requests per second overall
+CHANNEL_LIMIT = 5
+CHANNEL_WINDOW = 5.0
+GLOBAL_LIMIT = 50
+GLOBAL_WINDOW = 1.0
+
+# Limit of the routes that are not per channel, which the bot calls only when logging in
+ROUTE_LIMIT = 50
+
+DISCORD_EPOCH_MS = 1_420_070_400_000
+BOT_ID = 1
+APPLICATION_ID = 1
+
+# Seconds send_command waits for the bot to reply
+REPLY_TIMEOUT = 30.0
+
+# JSON error codes
+UNKNOWN_MESSAGE = 10008
+
+def user_payload(user_id, bot=False):
+    return {'id': str(user_id), 'username': f"user{user_id}", 'discriminator': '0', 'avatar': None, 'bot': bot}
+
+def _json_response(data, status=200, headers=None):
+    # discord.py only parses bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers, content_type='application/json')
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+class Window:
+    """A fixed-window rate limit, as Discord reports it in its headers."""
+    __slots__ = ('limit', 'period', 'remaining', 'reset_at')
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def take(self, now):
+        """Spends one request at now. Returns False if the window is exhausted."""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.period
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+class RouteStats:
+    """Requests, responses by status and server-side latencies of one route."""
+    __slots__ = ('requests', 'statuses', 'latencies')
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = defaultdict(int)
+        self.latencies = []
+
+class FakeDiscord:
+    """Serves the gateway and the REST API for a set of synthetic guilds with one text channel each.
+
+    Guild ids run from 1 to guilds; guild g's channel is channel_id(g) and
+    its member user_id(g) issues the commands sent with send_command. Each
+    REST request waits latency seconds before it is answered, to stand in
+    for the round trip to Discord.
+    """
+
+    def __init__(self, guilds, latency=0.0, channel_limit=CHANNEL_LIMIT, global_limit=GLOBAL_LIMIT):
+        self.guild_count = guilds
+        self.latency = latency
+        self.channel_limit = channel_limit
+        self.global_limit = global_limit
+        self.url = None
+        self._runner = None
+        self._sessions = {}  # session id -> Session
+        self._snowflakes = itertools.count()
+        self._messages = {}  # message id -> message payload
+        self._windows = {}  # (bucket, channel id) -> Window
+        self._global = Window(global_limit, GLOBAL_WINDOW)
+        self._replies = defaultdict(deque)  # channel id -> futures waiting for the bot's next message there
+        self.routes = defaultdict(RouteStats)  # 'METHOD /route/{template}' -> RouteStats
+        self.rate_limited = {'channel': 0, 'global': 0}
+        self.dispatched = defaultdict(int)  # gateway event name -> count
+
+        app = web.Application()
+        api = f"/api/v{API_VERSION}"
+        app.router.add_get('/gateway', self._gateway)
+        app.router.add_get(f"{api}/gateway", self._get_gateway)
+        app.router.add_get(f"{api}/gateway/bot", self._get_gateway_bot)
+        app.router.add_get(f"{api}/users/@me", self._get_me)
+        app.router.add_get(f"{api}/oauth2/applications/@me", self._get_application)
+        app.router.add_post(f"{api}/channels/{{channel_id}}/messages", self._create_message)
+        app.router.add_get(f"{api}/channels/{{channel_id}}/messages/{{message_id}}", self._get_message)
+        app.router.add_patch(f"{api}/channels/{{channel_id}}/messages/{{message_id}}", self._edit_message)
+        app.router.add_delete(f"{api}/channels/{{channel_id}}/messages/{{message_id}}", self._delete_message)
+        app.middlewares.append(self._middleware)
+        self.app = app
+
+    @property
+    def api_base(self):
+        """The value for discord.http.Route.BASE."""
+        return f"{self.url}/api/v{API_VERSION}"
+
+    @property
+    def gateway_url(self):
+        """The websocket URL of the gateway, for discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY."""
+        return self.url.replace('http', 'ws', 1) + '/gateway'
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Starts serving; port 0 picks a free port. Returns the base URL."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def close(self):
+        for session in list(self._sessions.values()):
+            await session.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    # Synthetic guilds
+
+    @staticmethod
+    def channel_id(guild_id):
+        return guild_id * 1000 + 1
+
+    @staticmethod
+    def user_id(guild_id):
+        return guild_id * 1000 + 2
+
+    def guild_payload(self, guild_id):
+        """A GUILD_CREATE payload for guild_id with one text channel and the bot as its only member listed."""
+        return {
+            'id': str(guild_id),
+            'name': f"guild{guild_id}",
+            'owner_id': str(self.user_id(guild_id)),
+            'unavailable': False,
+            'member_count': 2,
+            'large': False,
+            'features': [],
+            'emojis': [],
+            'stickers': [],
+            'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '117760', 'position': 0,
+                       'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+            'channels': [{'id': str(self.channel_id(guild_id)), 'type': 0, 'name': 'general', 'position': 0,
+                          'permission_overwrites': [], 'guild_id': str(guild_id)}],
+            'members': [{'user': user_payload(BOT_ID, bot=True), 'roles': [], 'joined_at': _iso(0),
+                         'deaf': False, 'mute': False, 'flags': 0}],
+            'voice_states': [],
+            'presences': [],
+            'threads': [],
+            'stage_instances': [],
+            'guild_scheduled_events': [],
+        }
+
+    def _snowflake(self):
+        return (int(time.time() * 1000) - DISCORD_EPOCH_MS) << 22 | next(self._snowflakes) % 4096
+
+    def _message(self, channel_id, author, content, guild_id=None):
+        message_id = self._snowflake()
+        message = {
+            'id': str(message_id),
+            'channel_id': str(channel_id),
+            'author': author,
+            'content': content,
+            'timestamp': _iso(time.time()),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'pinned': False,
+            'type': 0,
+        }
+        if guild_id is not None:
+            message['guild_id'] = str(guild_id)
+        return message
+
+    # Gateway
+
+    async def dispatch(self, event, data):
+        """Sends a dispatch event to every identified gateway session."""
+        self.dispatched[event] += 1
+        for session in list(self._sessions.values()):
+            if session.identified:
+                await session.dispatch(event, data)
+
+    async def send_command(self, guild_id, content, timeout=REPLY_TIMEOUT):
+        """Dispatches a MESSAGE_CREATE from guild_id's member and waits for the bot's reply in the channel.
+
+        Returns the seconds from the dispatch until the reply was created.
+        Raises asyncio.TimeoutError if there is no reply within timeout seconds.
+        """
+        channel_id = self.channel_id(guild_id)
+        message = self._message(channel_id, user_payload(self.user_id(guild_id)), content, guild_id)
+        message['member'] = {'roles': [], 'joined_at': _iso(0), 'deaf': False, 'mute': False, 'flags': 0}
+        reply = asyncio.get_running_loop().create_future()
+        self._replies[channel_id].append(reply)
+        start = time.perf_counter()
+        await self.dispatch('MESSAGE_CREATE', message)
+        await asyncio.wait_for(reply, timeout)
+        return time.perf_counter() - start
+
+    async def _gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        session = Session(self, ws, request.query.get('compress') == 'zlib-stream')
+        await session.send({'op': HELLO, 'd': {'heartbeat_interval': HEARTBEAT_INTERVAL_MS}})
+        try:
+            async for frame in ws:
+                if frame.type != WSMsgType.TEXT:
+                    continue
+                await session.receive(json.loads(frame.data))
+        finally:
+            self._sessions.pop(session.id, None)
+        return ws
+
+    # REST
+
+    def _bucket_name(self, request):
+        return f"{request.method} {request.match_info.route.resource.canonical}"
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        if request.path == '/gateway':
+            return await handler(request)
+        start = time.perf_counter()
+        route = request.match_info.route.resource
+        stats = self.routes[f"{request.method} {route.canonical if route is not None else request.path}"]
+        stats.requests += 1
+        if not request.headers.get('Authorization', '').startswith('Bot '):
+            response = _json_response({'message': '401: Unauthorized', 'code': 0}, status=401)
+        elif route is None:
+            response = _json_response({'message': '404: Not Found', 'code': 0}, status=404)
+        else:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            response = self._rate_limit(request)
+            if response is None:
+                response = await handler(request)
+                response.headers.update(self._rate_limit_headers(request))
+        stats.statuses[response.status] += 1
+        stats.latencies.append(time.perf_counter() - start)
+        return response
+
+    def _window(self, request):
+        channel_id = request.match_info.get('channel_id')
+        key = (self._bucket_name(request), channel_id)
+        window = self._windows.get(key)
+        if window is None:
+            if channel_id is None:
+                window = Window(ROUTE_LIMIT, GLOBAL_WINDOW)
+            else:
+                window = Window(self.channel_limit, CHANNEL_WINDOW)
+            self._windows[key] = window
+        return window
+
+    def _rate_limit_headers(self, request):
+        window = self._window(request)
+        reset_after = max(0.0, window.reset_at - time.monotonic())
+        return {
+            'X-RateLimit-Limit': str(window.limit),
+            'X-RateLimit-Remaining': str(window.remaining),
+            'X-RateLimit-Reset': f"{time.time() + reset_after:.3f}",
+            'X-RateLimit-Reset-After': f"{reset_after:.3f}",
+            'X-RateLimit-Bucket': uuid.uuid5(uuid.NAMESPACE_URL, self._bucket_name(request)).hex,
+        }
+
+    def _rate_limit(self, request):
+        """Spends the request's global and route limits, returning a 429 response if either is exhausted."""
+        now = time.monotonic()
+        if not self._global.take(now):
+            scope = 'global'
+            retry_after = self._global.reset_at - now
+        elif not self._window(request).take(now):
+            scope = 'user'
+            retry_after = self._window(request).reset_at - now
+        else:
+            return None
+        self.rate_limited['global' if scope == 'global' else 'channel'] += 1
+        # Global 429s carry no bucket headers, only the scope
+        headers = {'X-RateLimit-Global': 'true'} if scope == 'global' else self._rate_limit_headers(request)
+        headers.update({
+            'Retry-After': str(math.ceil(retry_after)),
+            'X-RateLimit-Scope': scope,
+            # discord.py takes a 429 without Via to come from Cloudflare rather than the API
+            'Via': '1.1 google',
+        })
+        body = {'message': 'You are being rate limited.', 'retry_after': round(retry_after, 3), 'global': scope == 'global'}
+        return _json_response(body, status=429, headers=headers)
+
+    async def _get_gateway(self, request):
+        return _json_response({'url': self.gateway_url})
+
+    async def _get_gateway_bot(self, request):
+        return _json_response({
+            'url': self.gateway_url,
+            'shards': 1,
+            'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1},
+        })
+
+    async def _get_me(self, request):
+        return _json_response(user_payload(BOT_ID, bot=True))
+
+    async def _get_application(self, request):
+        return _json_response({
+            'id': str(APPLICATION_ID),
+            'name': 'worldclock',
+            'description': '',
+            'icon': None,
+            'bot_public': False,
+            'bot_require_code_grant': False,
+            'owner': user_payload(BOT_ID + 1),
+            'team': None,
+            'verify_key': '0' * 64,
+            'flags': 0,
+        })
+
+    def _unknown_message(self):
+        return _json_response({'message': 'Unknown Message', 'code': UNKNOWN_MESSAGE}, status=404)
+
+    def _find(self, request):
+        message = self._messages.get(int(request.match_info['message_id']))
+        if message is None or message['channel_id'] != request.match_info['channel_id']:
+            return None
+        return message
+
+    async def _create_message(self, request):
+        channel_id = int(request.match_info['channel_id'])
+        body = await request.json()
+        guild_id = channel_id // 1000
+        message = self._message(channel_id, user_payload(BOT_ID, bot=True), body.get('content') or '', guild_id)
+        self._messages[int(message['id'])] = message
+        replies = self._replies.get(channel_id)
+        while replies:
+            reply = replies.popleft()
+            # Commands that timed out leave a cancelled future behind
+            if not reply.done():
+                reply.set_result(message)
+                break
+        await self.dispatch('MESSAGE_CREATE', message)
+        return _json_response(message)
+
+    async def _get_message(self, request):
+        message = self._find(request)
+        return self._unknown_message() if message is None else _json_response(message)
+
+    async def _edit_message(self, request):
+        message = self._find(request)
+        if message is None:
+            return self._unknown_message()
+        body = await request.json()
+        if 'content' in body:
+            message['content'] = body['content'] or ''
+        message['edited_timestamp'] = _iso(time.time())
+        await self.dispatch('MESSAGE_UPDATE', message)
+        return _json_response(message)
+
+    async def _delete_message(self, request):
+        message = self._find(request)
+        if message is None:
+            return self._unknown_message()
+        del self._messages[int(message['id'])]
+        await self.dispatch('MESSAGE_DELETE', {'id': message['id'], 'channel_id': message['channel_id'],
+                                               'guild_id': message.get('guild_id')})
+        return web.Response(status=204)
+
+    def stats(self):
+        """Returns request counts, statuses and p50/p99 server-side latency per route, and gateway counts."""
+        routes = {}
+        for name, route in sorted(self.routes.items()):
+            latencies = sorted(route.latencies)
+            routes[name] = {
+                'requests': route.requests,
+                'statuses': {str(status): count for status, count in sorted(route.statuses.items())},
+                'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+                'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3) if latencies else None,
+            }
+        return {
+            'routes': routes,
+            'rate_limited': dict(self.rate_limited),
+            'dispatched': dict(self.dispatched),
+            'messages': len(self._messages),
+        }
+
+class Session:
+    """One gateway connection, from HELLO to close."""
+
+    def __init__(self, server, ws, compress):
+        self.server = server
+        self.ws = ws
+        self.id = uuid.uuid4().hex
+        self.sequence = 0
+        self.identified = False
+        # zlib-stream: one compression context for the connection, each payload ending in a sync flush
+        self._zlib = zlib.compressobj() if compress else None
+
+    async def send(self, payload):
+        data = json.dumps(payload)
+        if self._zlib is None:
+            await self.ws.send_str(data)
+        else:
+            await self.ws.send_bytes(self._zlib.compress(data.encode()) + self._zlib.flush(zlib.Z_SYNC_FLUSH))
+
+    async def dispatch(self, event, data):
+        self.sequence += 1
+        await self.send({'op': DISPATCH, 't': event, 's': self.sequence, 'd': data})
+
+    async def receive(self, payload):
+        op = payload.get('op')
+        if op == HEARTBEAT:
+            await self.send({'op': HEARTBEAT_ACK, 'd': None})
+        elif op == IDENTIFY:
+            await self._identify(payload['d'])
+        elif op == RESUME:
+            # Events missed while disconnected are not replayed
+            self.server._sessions[self.id] = self
+            self.identified = True
+            await self.dispatch('RESUMED', {})
+
+    async def _identify(self, data):
+        server = self.server
+        guild_ids = range(1, server.guild_count + 1)
+        ready = {
+            'v': API_VERSION,
+            'user': user_payload(BOT_ID, bot=True),
+            'guilds': [{'id': str(guild_id), 'unavailable': True} for guild_id in guild_ids],
+            'session_id': self.id,
+            'resume_gateway_url': server.gateway_url,
+            'application': {'id': str(APPLICATION_ID), 'flags': 0},
+        }
+        if 'shard' in data:
+            ready['shard'] = data['shard']
+        server._sessions[self.id] = self
+        await self.dispatch('READY', ready)
+        for guild_id in guild_ids:
+            await self.dispatch('GUILD_CREATE', server.guild_payload(guild_id))
+        self.identified = True
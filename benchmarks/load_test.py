@@ -0,0 +1,155 @@
+"""End-to-end load test of the bot against the offline fake Discord in benchmarks/fake_discord.py.
+
+Starts the fake gateway and REST server, points discord.py at it and runs
+the real bot from worldclock.py against a scratch database. Every
+simulated guild then issues !addtimezone for a few zones, !displaytimezones
+and !currenttime, and the bot keeps running for a while so the refresh loop
+edits the boards at the following minute boundaries. The report, printed
+as JSON, has the REST calls the bot made per route and how they were
+answered (including 429s), the latency of each command and of the REST
+calls as the bot saw them, and the bot's own edit counters. Run from the
+repository root:
+
+    python -m benchmarks.load_test --guilds 2000 --duration 150
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+import discord
+import yarl
+from benchmarks import fake_discord
+
+GUILDS = 2000
+ZONES = ('Europe/London', 'Asia/Tokyo', 'America/New_York', 'Australia/Sydney', 'Asia/Kolkata')
+ZONES_PER_GUILD = 3
+
+# Seconds the bot keeps running after the commands, so boards are refreshed at least twice
+DURATION = 150
+
+# Guilds starting their commands per second; each guild runs its own commands in order. Every
+# command replies with one message, so 8 guilds a second stays under Discord's 50 requests a second
+COMMAND_RATE = 8
+
+def percentiles(latencies):
+    """Returns the count and p50/p99 of latencies in milliseconds."""
+    if not latencies:
+        return {'count': 0, 'p50_ms': None, 'p99_ms': None}
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+    }
+
+def record_latencies(trace, latencies):
+    """Adds handlers to an aiohttp trace recording each REST call's latency under 'METHOD route status'."""
+
+    async def on_request_start(session, context, params):
+        context.start = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        # Message and channel ids are replaced so calls group by route
+        path = '/'.join('{id}' if part.isdigit() else part for part in params.url.path.split('/'))
+        latencies[f"{params.method} {path} {params.response.status}"].append(time.perf_counter() - context.start)
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+
+def import_bot(server, database):
+    """Imports worldclock against the fake server and the scratch database, without connecting yet."""
+    os.environ['DATABASE'] = database
+    os.environ['SYNC_COMMANDS'] = '0'
+    discord.http.Route.BASE = server.api_base
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(server.gateway_url)
+    import worldclock
+    return worldclock
+
+async def guild_commands(server, guild_id, zones, commands, timeouts):
+    """Runs one guild's commands in order, recording each command's latency under its name."""
+    script = [f"!addtimezone {zone}" for zone in zones] + ["!displaytimezones", "!currenttime"]
+    for content in script:
+        name = content.split()[0]
+        try:
+            commands[name].append(await server.send_command(guild_id, content))
+        except asyncio.TimeoutError:
+            timeouts[name] += 1
+
+async def run(args):
+    server = fake_discord.FakeDiscord(args.guilds, latency=args.latency / 1000, global_limit=args.global_limit)
+    await server.start()
+    client_latencies = defaultdict(list)
+    commands = defaultdict(list)
+    timeouts = defaultdict(int)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            worldclock = import_bot(server, os.path.join(directory, 'load_test.db'))
+            # Measured next to the trace that feeds the bot's edit dispatcher
+            record_latencies(worldclock.bot.http.http_trace, client_latencies)
+
+            started = time.perf_counter()
+            await worldclock.bot.login('fake-token')
+            bot_task = asyncio.create_task(worldclock.bot.connect())
+            await worldclock.bot.wait_until_ready()
+            ready = time.perf_counter() - started
+
+            started = time.perf_counter()
+            tasks = []
+            for guild_id in range(1, args.guilds + 1):
+                zones = [ZONES[(guild_id + i) % len(ZONES)] for i in range(args.zones)]
+                tasks.append(asyncio.create_task(guild_commands(server, guild_id, zones, commands, timeouts)))
+                await asyncio.sleep(1 / args.rate)
+            await asyncio.gather(*tasks)
+            command_time = time.perf_counter() - started
+
+            await asyncio.sleep(args.duration)
+            await worldclock.bot.close()
+            await bot_task
+    finally:
+        await server.close()
+
+    return {
+        'guilds': args.guilds,
+        'zones_per_guild': args.zones,
+        'ready_seconds': round(ready, 3),
+        'command_seconds': round(command_time, 3),
+        'duration_seconds': args.duration,
+        'commands': {name: percentiles(latencies) for name, latencies in sorted(commands.items())},
+        'command_timeouts': dict(timeouts),
+        'client_rest': {name: percentiles(latencies) for name, latencies in sorted(client_latencies.items())},
+        'server': server.stats(),
+        'bot': {
+            'boards': len(worldclock.board_registry),
+            'edits': worldclock.rest_stats,
+            'dispatcher': worldclock.edit_dispatcher.stats(),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--guilds', type=int, default=GUILDS, help="number of simulated guilds")
+    parser.add_argument('--zones', type=int, default=ZONES_PER_GUILD, help="timezones each guild adds")
+    parser.add_argument('--duration', type=float, default=DURATION, help="seconds to keep refreshing after the commands")
+    parser.add_argument('--rate', type=float, default=COMMAND_RATE, help="guilds starting their commands per second")
+    parser.add_argument('--latency', type=float, default=0.0, help="milliseconds added to every REST response")
+    parser.add_argument('--global-limit', type=int, default=fake_discord.GLOBAL_LIMIT,
+                        help="REST requests per second allowed before global 429s")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    # The bot's own messages would corrupt the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
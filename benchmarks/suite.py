@@ -0,0 +1,327 @@
+"""Benchmarks the render, offset sort and storage hot paths and reports JSON.
+
+Every case runs against synthetic data and a scratch database, with no
+connection to Discord:
+
+    render    world clock pages for one board of 10, 1k and 100k zones
+    sort      offset sorting of 10, 1k and 100k rows, recomputed and cached
+    tick      one refresh tick of 1, 1k and 50k live boards through the tick bus
+    commands  addtimezone / listtimezones / removetimezone in a guild of 10, 1k and 100k zones
+    boards    saving and restoring 1, 1k and 50k boards
+
+Each case reports throughput (items per second, see unit), p50/p99 latency
+of one operation and the peak memory one operation allocates. Run from the
+repository root, optionally keeping the results to compare a later commit:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --compare before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import inspect
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+import boards
+import render
+import storage
+import ticks
+import tzengine
+from benchmarks.synthetic import synthetic_boards, synthetic_rows
+
+ZONE_COUNTS = (10, 1000, 100_000)
+BOARD_COUNTS = (1, 1000, 50_000)
+
+# Zones per guild, and distinct zone lists shared by the guilds, in the tick benchmark
+ZONES_PER_BOARD = 10
+ZONE_SETS = 100
+
+# Each case runs for at least MIN_ITERATIONS and until its time budget in seconds is spent
+MIN_ITERATIONS = 5
+MAX_ITERATIONS = 10_000
+TIME_BUDGET = 1.0
+QUICK_TIME_BUDGET = 0.2
+
+# setup runs untimed before every operation; run is the timed operation, covering items units of work
+Case = namedtuple('Case', 'group name params unit items setup run')
+
+async def run_once(func):
+    """Calls func, awaiting the result if it is a coroutine."""
+    if func is None:
+        return
+    result = func()
+    if inspect.isawaitable(result):
+        await result
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def measure(case, budget):
+    """Times case's operation repeatedly, then traces one more run for its peak allocation."""
+    latencies = []
+    deadline = time.perf_counter() + budget
+    while len(latencies) < MIN_ITERATIONS or (time.perf_counter() < deadline and len(latencies) < MAX_ITERATIONS):
+        await run_once(case.setup)
+        start = time.perf_counter()
+        await run_once(case.run)
+        latencies.append(time.perf_counter() - start)
+
+    # Tracing slows Python down, so memory is measured apart from the timed runs
+    await run_once(case.setup)
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        await run_once(case.run)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(latencies)
+    return {
+        'group': case.group,
+        'name': case.name,
+        'params': case.params,
+        'unit': case.unit,
+        'iterations': len(latencies),
+        'throughput': round(case.items * len(latencies) / sum(latencies), 1),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 4),
+        'peak_memory_bytes': peak - baseline,
+    }
+
+def snapshot(rows):
+    """Returns a storage.ZoneSnapshot of rows, as the zone cache would hold it."""
+    rows = tuple(rows)
+    return storage.ZoneSnapshot(0, rows, storage.fingerprint(rows))
+
+class Clock:
+    """Hands out successive minute boundaries, so every render falls in a new minute."""
+
+    def __init__(self):
+        self.instant = (tzengine.now() // 60 + 1) * 60
+
+    def next_minute(self):
+        self.instant += 60
+        return self.instant
+
+def render_cases():
+    clock = Clock()
+    for count in ZONE_COUNTS:
+        zones = snapshot(synthetic_rows(count))
+        for mode in render.BOARD_MODES:
+            # Pages are built from scratch; the render cache would hide all but the first board
+            yield Case(
+                'render', f"render_timezones[{mode}]", {'zones': count, 'mode': mode}, 'rows', count, None,
+                lambda zones=zones, mode=mode: render.render_timezones(zones, mode, clock.next_minute()),
+            )
+
+def sort_cases():
+    instant = tzengine.now()
+    for count in ZONE_COUNTS:
+        rows = synthetic_rows(count)
+        cache = tzengine.OffsetCache()
+        keys = itertools.count()
+        # The order is recomputed when the zone list changes or a zone crosses a transition
+        yield Case(
+            'sort', 'sorted_rows[recompute]', {'zones': count}, 'rows', count, None,
+            lambda rows=rows, cache=cache, keys=keys: cache.sorted_rows(rows, instant, key=next(keys)),
+        )
+        # Otherwise every tick reuses the order cached under the zone list's fingerprint
+        yield Case(
+            'sort', 'sorted_rows[cached]', {'zones': count}, 'rows', count, None,
+            lambda rows=rows, cache=cache: cache.sorted_rows(rows, instant, key='board'),
+        )
+
+def tick_cases():
+    clock = Clock()
+    zone_sets = [snapshot(synthetic_rows(ZONES_PER_BOARD, seed)) for seed in range(ZONE_SETS)]
+
+    def zones_of(board):
+        return zone_sets[board.guild_id % ZONE_SETS]
+
+    def render_world_clock(board, instant):
+        zones = zones_of(board)
+        pages = render.render_board(board.kind, zones, board.mode, instant)
+        return pages, render.next_refresh(board.kind, board.mode, zones.rows, instant)
+
+    def deliver(board, pages):
+        # Stands in for the edit dispatcher: the edit is recorded as pushed straight away
+        pages_hash = boards.content_hash(pages)
+        if pages_hash == board.content_hash:
+            return False
+        board.content_hash = pages_hash
+        return True
+
+    for count in BOARD_COUNTS:
+        registry = boards.BoardRegistry()
+        registry.load(synthetic_boards(count))
+        bus = ticks.TickBus(registry, deliver)
+        bus.subscribe(boards.WORLD_CLOCK, lambda board: (zones_of(board).fingerprint, board.mode), render_world_clock)
+        # Every board is due at each minute boundary, the busiest tick there is
+        yield Case(
+            'tick', 'TickBus.publish', {'boards': count, 'zone_sets': ZONE_SETS}, 'boards', count, None,
+            lambda bus=bus: bus.publish(clock.next_minute()),
+        )
+
+class Context:
+    """The parts of a command context the timezone commands use, with sent messages discarded."""
+    interaction = None
+
+    def __init__(self, guild_id):
+        self.guild = type('Guild', (), {'id': guild_id})()
+        self.channel = type('Channel', (), {'id': guild_id + 1})()
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+async def command_cases(worldclock):
+    labels = itertools.count()
+    for count in ZONE_COUNTS:
+        guild_id = count
+        async with worldclock.database.transaction() as db:
+            await db.executemany(
+                "INSERT INTO timezones (guild_id, label, timezone) VALUES (?, ?, ?)",
+                [(guild_id, label, zone) for label, zone in synthetic_rows(count)],
+            )
+        await worldclock.zone_cache.load()
+        ctx = Context(guild_id)
+        pending = []
+
+        async def add(ctx=ctx):
+            label = f"bench{next(labels)}"
+            await worldclock.addtimezone.callback(ctx, 'Asia/Tokyo', label=label)
+
+        async def setup_remove(guild_id=guild_id, pending=pending):
+            label = f"bench{next(labels)}"
+            await worldclock.zone_cache.add(guild_id, label, 'Asia/Tokyo')
+            pending.append(label)
+
+        async def remove(ctx=ctx, pending=pending):
+            await worldclock.removetimezone.callback(ctx, pending.pop())
+
+        yield Case('commands', 'addtimezone', {'zones': count}, 'commands', 1, None, add)
+        yield Case('commands', 'listtimezones', {'zones': count}, 'commands', 1, None,
+                   lambda ctx=ctx: worldclock.listtimezones.callback(ctx))
+        yield Case('commands', 'removetimezone', {'zones': count}, 'commands', 1, setup_remove, remove)
+
+async def board_cases(worldclock):
+    for count in BOARD_COUNTS:
+        board_list = synthetic_boards(count)
+
+        def mark_changed(board_list=board_list):
+            registry = worldclock.board_registry = boards.BoardRegistry()
+            for board in board_list:
+                registry.add(board, board.next_due)
+
+        def fresh_registry():
+            worldclock.board_registry = boards.BoardRegistry()
+
+        yield Case('boards', 'save_boards', {'boards': count}, 'boards', count, mark_changed, worldclock.save_boards)
+        # Restore what the last save wrote, saving it first in case save_boards was not run
+        mark_changed()
+        await worldclock.save_boards()
+        yield Case('boards', 'load_boards', {'boards': count}, 'boards', count, fresh_registry, worldclock.load_boards)
+        async with worldclock.database.transaction() as db:
+            await db.execute("DELETE FROM boards")
+
+def import_worldclock(path):
+    """Imports the bot module against the scratch database at path, without connecting to Discord."""
+    os.environ['DATABASE'] = path
+    os.environ.setdefault('SYNC_COMMANDS', '0')
+    import worldclock
+    return worldclock
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(groups, budget):
+    results = []
+
+    async def collect(case):
+        if case.group in groups:
+            print(f"{case.group}: {case.name} {case.params}", file=sys.stderr)
+            results.append(await measure(case, budget))
+
+    for cases in (render_cases, sort_cases, tick_cases):
+        for case in cases():
+            await collect(case)
+
+    if groups & {'commands', 'boards'}:
+        with tempfile.TemporaryDirectory() as directory:
+            worldclock = import_worldclock(os.path.join(directory, 'bench.db'))
+            await worldclock.create_db()
+            try:
+                async for case in command_cases(worldclock):
+                    await collect(case)
+                async for case in board_cases(worldclock):
+                    await collect(case)
+            finally:
+                await worldclock.database.close()
+    return results
+
+def compare(results, baseline):
+    """Prints each case's p50 latency and throughput against a previous run's JSON."""
+    previous = {(r['group'], r['name'], json.dumps(r['params'], sort_keys=True)): r for r in baseline['results']}
+    print(f"comparing against {baseline['meta'].get('commit')}", file=sys.stderr)
+    for result in results:
+        old = previous.get((result['group'], result['name'], json.dumps(result['params'], sort_keys=True)))
+        if old is None:
+            continue
+        print(
+            f"{result['name']:<28} {json.dumps(result['params']):<36}"
+            f" | p50 {old['p50_ms']:>10.3f}ms -> {result['p50_ms']:>10.3f}ms"
+            f" | throughput x{result['throughput'] / old['throughput']:.2f}",
+            file=sys.stderr,
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--group', action='append', choices=('render', 'sort', 'tick', 'commands', 'boards'),
+                        help="run only this group of cases; may be repeated")
+    parser.add_argument('--quick', action='store_true', help=f"spend {QUICK_TIME_BUDGET}s per case instead of {TIME_BUDGET}s")
+    parser.add_argument('--output', help="write the JSON results to this file instead of stdout")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    groups = set(args.group or ('render', 'sort', 'tick', 'commands', 'boards'))
+    budget = QUICK_TIME_BUDGET if args.quick else TIME_BUDGET
+    # The bot's own messages (migrations, loaded boards) would corrupt the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run(groups, budget))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': int(time.time()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': render.tzbatch is not None,
+            'time_budget': budget,
+        },
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""Synthetic zone rows and boards shared by the benchmarks."""
+import random
+import pytz
+import boards
+import render
+
+# Discord snowflakes: milliseconds since 2015 shifted left by 22 bits, plus worker and sequence bits
+SNOWFLAKE_BASE = (1_700_000_000_000 - 1_420_070_400_000) << 22
+
+def synthetic_rows(count, seed=0):
+    """Returns count (label, timezone) rows with zones drawn at random from the common zones."""
+    rng = random.Random(seed)
+    zones = pytz.common_timezones
+    return [(f"zone{i}", rng.choice(zones)) for i in range(count)]
+
+def synthetic_boards(count, kind=boards.WORLD_CLOCK, mode=render.TEXT_MODE):
+    """Returns count boards spread over 5000 guilds and 1000 channels with snowflake-like ids."""
+    return [
+        boards.Board(i % 5000 + 1, i % 1000 + 1, SNOWFLAKE_BASE + (i * 7919 << 22) + i % 4096, kind, mode)
+        for i in range(count)
+    ]
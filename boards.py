@@ -0,0 +1,266 @@
+"""Registry of the live boards the bot keeps up to date."""
+import timerwheel
+
+# Board types
+WORLD_CLOCK = 'worldclock'
+RS_GAME_TIME = 'rsgametime'
+BOARD_KINDS = (WORLD_CLOCK, RS_GAME_TIME)
+
+# next_due of boards that are not scheduled
+FOREVER = float('inf')
+
+# Seconds the other boards of a retried parked channel wait behind its probe edit, so a
+# channel the bot still cannot edit in costs one failed edit per retry
+PROBE_DELAY = 60
+
+def jitter_delay(message_id, spread):
+    """Returns a board's fixed delay in [0, spread) seconds, spreading boards evenly over the window."""
+    if spread <= 0:
+        return 0
+    # Fibonacci hashing mixes the low bits of snowflake ids, which barely change between messages
+    return (message_id * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF) * spread >> 64
+
+def content_hash(pages):
+    """Returns a compact hash of each page of a board's content.
+
+    str caches its hash, so hashing a render shared by many boards is
+    computed once. The values are only compared within one process.
+    """
+    return tuple(hash(page) for page in pages)
+
+class Board:
+    """A message the bot keeps editing, with its render configuration."""
+    __slots__ = ('guild_id', 'channel_id', 'message_id', 'kind', 'mode', 'content_hash', 'next_due', 'pages')
+
+    def __init__(self, guild_id, channel_id, message_id, kind, mode, content_hash=None, next_due=0, pages=()):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.kind = kind
+        self.mode = mode
+        self.content_hash = content_hash  # content_hash() of the last content pushed to Discord
+        self.next_due = next_due  # Epoch instant of the next refresh
+        self.pages = tuple(pages)  # Message ids of the continuation pages after message_id
+
+    @property
+    def key(self):
+        return (self.guild_id, self.channel_id, self.message_id)
+
+    def __repr__(self):
+        return f"<Board {self.kind} {self.key} mode={self.mode}>"
+
+class BoardRegistry:
+    """Tracks any number of live boards per kind, ordered by when they are next due.
+
+    Each kind keeps a timer wheel of message ids, so scheduling and
+    cancelling are O(1) and a tick only touches the boards that are actually
+    due. A board scheduled for a refresh is placed offset seconds after its
+    due time plus its own jitter in [0, spread), so boards that change at the
+    same minute boundary reach Discord spread evenly over the window instead
+    of all at once.
+
+    Reverse indexes by channel, guild and continuation page let deletion
+    events drop the affected boards without scanning. Channels where the bot
+    lost permission are parked: their boards are not scheduled until the
+    channel is unparked or retried, so they cost no REST calls in the meantime.
+    """
+
+    def __init__(self, offset=0, spread=0):
+        self.offset = offset
+        self.spread = spread
+        self._boards = {}  # message_id -> Board
+        self._wheels = {}  # kind -> TimerWheel of message ids, created on first use
+        self._changes = {}  # message_id -> Board to save, or None to delete
+        self._by_channel = {}  # channel_id -> set of board message ids
+        self._by_guild = {}  # guild_id -> set of board message ids
+        self._pages = {}  # continuation page message id -> board message id
+        self._parked = {}  # channel id the bot cannot edit messages in -> instant it was parked
+
+    def __len__(self):
+        return len(self._boards)
+
+    def _wheel(self, kind):
+        wheel = self._wheels.get(kind)
+        if wheel is None:
+            wheel = self._wheels[kind] = timerwheel.TimerWheel()
+        return wheel
+
+    def __iter__(self):
+        return iter(list(self._boards.values()))
+
+    def get(self, message_id):
+        """Returns the board for message_id, or None."""
+        return self._boards.get(message_id)
+
+    def _index(self, board):
+        self._by_channel.setdefault(board.channel_id, set()).add(board.message_id)
+        self._by_guild.setdefault(board.guild_id, set()).add(board.message_id)
+        for page in board.pages:
+            self._pages[page] = board.message_id
+
+    def _unindex(self, board):
+        for index, key in ((self._by_channel, board.channel_id), (self._by_guild, board.guild_id)):
+            message_ids = index.get(key)
+            if message_ids is not None:
+                message_ids.discard(board.message_id)
+                if not message_ids:
+                    del index[key]
+        for page in board.pages:
+            self._pages.pop(page, None)
+
+    def add(self, board, instant):
+        """Registers board, posted at instant, replacing any board on the same message."""
+        old = self._boards.get(board.message_id)
+        if old is not None:
+            self._unindex(old)
+        self._boards[board.message_id] = board
+        self._index(board)
+        self._changes[board.message_id] = board
+        # The bot just posted in this channel, so it can edit there again
+        next_due = board.next_due
+        self.unpark_channel(board.channel_id, instant)
+        self.schedule(board, next_due)
+        return board
+
+    def set_pages(self, board, pages):
+        """Replaces the continuation page message ids of board."""
+        pages = tuple(pages)
+        if pages == board.pages:
+            return
+        for page in board.pages:
+            self._pages.pop(page, None)
+        board.pages = pages
+        if self._boards.get(board.message_id) is board:
+            for page in pages:
+                self._pages[page] = board.message_id
+            self._changes[board.message_id] = board
+
+    def remove(self, message_id):
+        """Deregisters the board on message_id and returns it, or None."""
+        board = self._boards.pop(message_id, None)
+        if board is not None:
+            self._wheel(board.kind).cancel(message_id)
+            self._unindex(board)
+            self._changes[message_id] = None
+        return board
+
+    def forget_page(self, message_id):
+        """Drops a deleted continuation page from its board and returns the board, or None.
+
+        The board's content is marked unknown so its next refresh sends the page again.
+        """
+        board_id = self._pages.pop(message_id, None)
+        if board_id is None:
+            return None
+        board = self._boards[board_id]
+        board.pages = tuple(page for page in board.pages if page != message_id)
+        board.content_hash = None
+        self._changes[board_id] = board
+        return board
+
+    def remove_channel(self, channel_id):
+        """Deregisters every board in channel_id and returns them."""
+        self._parked.pop(channel_id, None)
+        return [self.remove(message_id) for message_id in list(self._by_channel.get(channel_id, ()))]
+
+    def remove_guild(self, guild_id):
+        """Deregisters every board in guild_id and returns them."""
+        removed = [self.remove(message_id) for message_id in list(self._by_guild.get(guild_id, ()))]
+        for board in removed:
+            self._parked.pop(board.channel_id, None)
+        return removed
+
+    def park_channel(self, channel_id, instant):
+        """Stops refreshing the boards in channel_id from instant until it is unparked."""
+        self._parked[channel_id] = instant
+        for message_id in self._by_channel.get(channel_id, ()):
+            board = self._boards[message_id]
+            board.next_due = FOREVER
+            self._wheel(board.kind).cancel(message_id)
+
+    def unpark_channel(self, channel_id, instant):
+        """Makes the parked boards of channel_id due again at instant. Returns how many were parked."""
+        if self._parked.pop(channel_id, None) is None:
+            return 0
+        message_ids = self._by_channel.get(channel_id, ())
+        for message_id in message_ids:
+            self.schedule(self._boards[message_id], instant, jitter=False)
+        return len(message_ids)
+
+    def unpark_guild(self, guild_id, instant):
+        """Unparks every parked channel with boards in guild_id. Returns how many boards were parked."""
+        channels = {self._boards[message_id].channel_id for message_id in self._by_guild.get(guild_id, ())}
+        return sum(self.unpark_channel(channel_id, instant) for channel_id in channels)
+
+    def retry_parked(self, instant, after):
+        """Unparks the channels parked for at least after seconds. Returns how many were retried.
+
+        One board of each channel is due at instant and probes whether the bot
+        can edit there again; the others wait PROBE_DELAY seconds longer. If
+        the probe is refused the channel is parked again and the others skip.
+        """
+        retried = [channel_id for channel_id, parked in self._parked.items() if instant - parked >= after]
+        for channel_id in retried:
+            del self._parked[channel_id]
+            message_ids = sorted(self._by_channel.get(channel_id, ()))
+            for index, message_id in enumerate(message_ids):
+                self.schedule(self._boards[message_id], instant + (PROBE_DELAY if index else 0), jitter=False)
+        return len(retried)
+
+    def is_parked(self, board):
+        """Returns True if board's channel is parked."""
+        return board.channel_id in self._parked
+
+    def load(self, loaded):
+        """Bulk-registers boards restored from storage, without marking them as changed."""
+        for board in loaded:
+            self._boards[board.message_id] = board
+            self._index(board)
+            self.schedule(board, board.next_due, jitter=False)
+
+    def take_changes(self):
+        """Returns and clears the boards added and the message ids removed since the last call."""
+        changes, self._changes = self._changes, {}
+        saved = [board for board in changes.values() if board is not None]
+        removed = [message_id for message_id, board in changes.items() if board is None]
+        return saved, removed
+
+    def restore_changes(self, saved, removed):
+        """Puts back changes from take_changes that could not be saved, under any made since."""
+        for board in saved:
+            self._changes.setdefault(board.message_id, board)
+        for message_id in removed:
+            self._changes.setdefault(message_id, None)
+
+    def schedule(self, board, next_due, jitter=True):
+        """Sets when board is next due for a refresh.
+
+        With jitter, the board is handed out at its slot in the refresh window
+        after next_due; without, right at next_due. Boards in parked channels
+        and boards that never change stay unscheduled.
+        """
+        wheel = self._wheel(board.kind)
+        if board.channel_id in self._parked:
+            next_due = FOREVER
+        board.next_due = next_due
+        if next_due == FOREVER:
+            wheel.cancel(board.message_id)
+        elif jitter:
+            wheel.schedule(board.message_id, next_due + self.offset + jitter_delay(board.message_id, self.spread))
+        else:
+            wheel.schedule(board.message_id, next_due)
+
+    def pop_due(self, kind, instant):
+        """Removes and returns the boards of kind that are due at instant.
+
+        Callers reschedule each returned board once it has been refreshed.
+        """
+        boards = self._boards
+        return [boards[message_id] for message_id in self._wheel(kind).advance(instant) if message_id in boards]
+
+    def mark_due(self, kind, instant, guild_id):
+        """Makes guild_id's boards of kind due at instant, e.g. after its zone list changed."""
+        for message_id in list(self._by_guild.get(guild_id, ())):
+            board = self._boards[message_id]
+            if board.kind == kind and board.next_due > instant:
+                self.schedule(board, instant, jitter=False)
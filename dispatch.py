@@ -0,0 +1,182 @@
+"""Queued, rate-limit-aware delivery of board edits."""
+from collections import deque
+import asyncio
+import re
+import time
+
+# Discord allows 5 message edits per 5 seconds in a channel and 50 requests per second overall
+CHANNEL_CAPACITY = 5
+CHANNEL_PERIOD = 5.0
+GLOBAL_CAPACITY = 50
+GLOBAL_PERIOD = 1.0
+
+# Message routes take the channel id as their major parameter, so it keys their rate limit
+_CHANNEL_ROUTE = re.compile(r'/api/v\d+/channels/(\d+)/messages(?:/\d+)?$')
+
+class TokenBucket:
+    """Allows capacity requests per period, refilled continuously."""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now, cost=1):
+        """Returns how many seconds to wait before cost requests may be sent.
+
+        A cost above capacity only waits for a full bucket, and leaves it in debt.
+        """
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, now, cost=1):
+        """Spends one token per request for cost requests sent at now."""
+        self._refill(now)
+        self.tokens -= cost
+
+    def sync(self, remaining, reset_after, now):
+        """Aligns the bucket with Discord's X-RateLimit-Remaining and X-RateLimit-Reset-After headers."""
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+        if remaining <= 0:
+            self.block(reset_after, now)
+
+    def block(self, seconds, now):
+        """Stops all requests for the given number of seconds, e.g. after a 429."""
+        self.tokens = 0.0
+        self.updated = now
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+class EditDispatcher:
+    """Delivers board edits with bounded concurrency and per-channel token buckets.
+
+    Pending edits are kept per message, so several renders submitted for the
+    same board before it is edited collapse into the latest one. A channel is
+    handled by at most one worker at a time; channels out of tokens are put
+    back on the ready queue once their bucket refills instead of blocking a
+    worker. An edit spends one token per REST call it makes, as counted by
+    cost, so boards split over several messages stay within the limits.
+    """
+
+    def __init__(self, edit, concurrency=8, cost=None):
+        self.edit = edit  # Coroutine function taking (board, content)
+        self.cost = cost or (lambda board, content: 1)  # Callable taking (board, content), returning REST calls
+        self.concurrency = concurrency
+        self.global_bucket = TokenBucket(GLOBAL_CAPACITY, GLOBAL_PERIOD)
+        self._buckets = {}  # channel_id -> TokenBucket
+        self._pending = {}  # message_id -> (board, content)
+        self._channels = {}  # channel_id -> deque of message ids with a pending edit
+        self._ready = None
+        self._workers = []
+        self.sent = 0
+        self.coalesced = 0
+        self.throttled = 0
+        self.rate_limited = 0
+
+    def start(self):
+        """Starts the worker tasks on the running event loop."""
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        # Channels submitted before start
+        for channel_id in self._channels:
+            self._ready.put_nowait(channel_id)
+
+    async def close(self):
+        """Stops the workers. Edits still pending are dropped."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, board, content):
+        """Queues content to be pushed to board, replacing any edit still pending for it."""
+        if board.message_id in self._pending:
+            self.coalesced += 1
+            self._pending[board.message_id] = (board, content)
+            return
+        self._pending[board.message_id] = (board, content)
+        queue = self._channels.get(board.channel_id)
+        if queue is None:
+            queue = self._channels[board.channel_id] = deque()
+            if self._ready is not None:
+                self._ready.put_nowait(board.channel_id)
+        queue.append(board.message_id)
+
+    def pending(self):
+        """Returns the number of edits waiting to be sent."""
+        return len(self._pending)
+
+    def _bucket(self, channel_id):
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = TokenBucket(CHANNEL_CAPACITY, CHANNEL_PERIOD)
+        return bucket
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            channel_id = await self._ready.get()
+            now = time.monotonic()
+            bucket = self._bucket(channel_id)
+            queue = self._channels[channel_id]
+            board, content = self._pending[queue[0]]
+            cost = self.cost(board, content)
+            wait = max(bucket.delay(now, cost), self.global_bucket.delay(now, cost))
+            if wait > 0:
+                self.throttled += 1
+                loop.call_later(wait, self._ready.put_nowait, channel_id)
+                continue
+
+            del self._pending[queue.popleft()]
+            bucket.take(now, cost)
+            self.global_bucket.take(now, cost)
+            try:
+                await self.edit(board, content)
+                self.sent += 1
+            except Exception as e:
+                print(f"Failed to update board {board.message_id}: {e}")
+            finally:
+                if queue:
+                    self._ready.put_nowait(channel_id)
+                else:
+                    del self._channels[channel_id]
+
+    def observe(self, path, status, headers):
+        """Updates the buckets from the rate-limit headers of a Discord REST response."""
+        now = time.monotonic()
+        match = _CHANNEL_ROUTE.search(path)
+        if status == 429:
+            self.rate_limited += 1
+            retry_after = float(headers.get('Retry-After', 1))
+            if headers.get('X-RateLimit-Global') or headers.get('X-RateLimit-Scope') == 'global':
+                self.global_bucket.block(retry_after, now)
+            elif match:
+                self._bucket(int(match.group(1))).block(retry_after, now)
+            return
+        if match and 'X-RateLimit-Remaining' in headers:
+            remaining = int(headers['X-RateLimit-Remaining'])
+            reset_after = float(headers.get('X-RateLimit-Reset-After', CHANNEL_PERIOD))
+            self._bucket(int(match.group(1))).sync(remaining, reset_after, now)
+
+    def stats(self):
+        """Returns the delivery counters."""
+        return {
+            'sent': self.sent,
+            'pending': len(self._pending),
+            'coalesced': self.coalesced,
+            'throttled': self.throttled,
+            'rate_limited': self.rate_limited,
+        }
@@ -0,0 +1,81 @@
+"""Fitting board rows into Discord's 2000 character message limit.
+
+Boards that fit use the classic one-row-per-line format in a single
+message. Larger clock boards switch to a dense layout: labels are padded
+only to the longest label, rows are packed side by side into as many
+columns as fit the line width, and the lines are split across as many
+messages as needed. The layout depends only on the zone set, so it is
+measured once per zone-set fingerprint.
+"""
+from collections import namedtuple
+
+MESSAGE_LIMIT = 2000
+FENCE = "```"
+
+# Widest line of packed columns, and what separates the columns on a line
+LINE_WIDTH = 80
+COLUMN_SEPARATOR = " || "
+
+# Longest label a timezone can be added with, so a row of the widest label fits a message
+MAX_LABEL_LENGTH = 100
+
+# Characters in a clock row besides its padded label
+CLASSIC_ROW = len(" | MM/DD   | HH:MM AM\n")
+DENSE_ROW = len(" | MM/DD | HH:MM AM")
+
+# label_width: padding of every label; columns: rows per line; rows_per_page: rows per message
+DenseLayout = namedtuple('DenseLayout', 'label_width columns rows_per_page')
+
+# Drop all cached layouts once this many zone sets are cached
+MAX_CACHED_LAYOUTS = 4096
+
+_layouts = {}
+
+def clock_layout(key, labels):
+    """Returns None if the classic board fits in one message, else a DenseLayout.
+
+    The result is cached under key, which must identify the zone set.
+    """
+    if key in _layouts:
+        return _layouts[key]
+    classic = 2 * len(FENCE) + sum(max(20, len(label)) + CLASSIC_ROW for label in labels)
+    layout = None
+    if classic > MESSAGE_LIMIT:
+        label_width = max(len(label) for label in labels)
+        row_width = label_width + DENSE_ROW
+        columns = max(1, (LINE_WIDTH + len(COLUMN_SEPARATOR)) // (row_width + len(COLUMN_SEPARATOR)))
+        line_length = columns * row_width + (columns - 1) * len(COLUMN_SEPARATOR) + 1
+        lines_per_page = max(1, (MESSAGE_LIMIT - 2 * len(FENCE)) // line_length)
+        layout = DenseLayout(label_width, columns, lines_per_page * columns)
+    if len(_layouts) >= MAX_CACHED_LAYOUTS:
+        _layouts.clear()
+    _layouts[key] = layout
+    return layout
+
+def dense_pages(rows, layout):
+    """Packs equal-width dense rows into fenced pages, filling each page column by column."""
+    pages = []
+    for start in range(0, len(rows), layout.rows_per_page):
+        chunk = rows[start:start + layout.rows_per_page]
+        height = -(-len(chunk) // layout.columns)
+        lines = [
+            COLUMN_SEPARATOR.join(chunk[line::height]) + "\n"
+            for line in range(height)
+        ]
+        pages.append(FENCE + "".join(lines) + FENCE)
+    return tuple(pages)
+
+def split_lines(lines, limit=MESSAGE_LIMIT):
+    """Greedily packs newline-terminated lines into as few unfenced messages as fit in limit."""
+    pages = []
+    current = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) > limit:
+            pages.append("".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line)
+    pages.append("".join(current))
+    return tuple(pages)
@@ -0,0 +1,36 @@
+"""Gateway client profiles: which intents and caches the discord.py client keeps."""
+import discord
+
+# default: discord.py's defaults. lean: only what a clock bot uses, with every
+# optional cache turned off.
+DEFAULT_PROFILE = 'default'
+LEAN_PROFILE = 'lean'
+CLIENT_PROFILES = (DEFAULT_PROFILE, LEAN_PROFILE)
+
+def client_options(profile, prefix_commands=True):
+    """Returns the intents and cache keyword arguments for a client in the given profile.
+
+    prefix_commands keeps the message events and message content that ! commands need.
+    """
+    if profile == DEFAULT_PROFILE:
+        intents = discord.Intents.default()
+        intents.message_content = prefix_commands
+        return {'intents': intents}
+    if profile != LEAN_PROFILE:
+        raise ValueError(f"Unknown client profile {profile}. Use one of: {', '.join(CLIENT_PROFILES)}.")
+
+    # Guild and channel events keep ctx.guild and channel lookups working; slash
+    # commands arrive as interactions, which need no intent at all
+    intents = discord.Intents.none()
+    intents.guilds = True
+    if prefix_commands:
+        intents.guild_messages = True
+        intents.dm_messages = True
+        intents.message_content = True
+    return {
+        'intents': intents,
+        # Boards are edited by id, so sent and received messages are never looked up again
+        'max_messages': None,
+        'member_cache_flags': discord.MemberCacheFlags.none(),
+        'chunk_guilds_at_startup': False,
+    }
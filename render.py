@@ -0,0 +1,164 @@
+"""Message rendering for the world clock and Runescape Game Time boards."""
+from collections import OrderedDict
+import sys
+import boards
+import layout
+import timefmt
+import tzengine
+
+try:
+    import tzbatch  # Optional, requires numpy
+except ImportError:
+    tzbatch = None
+
+# Board modes: pre-rendered clock text, or offsets with Discord timestamp markup
+TEXT_MODE = 'text'
+TIMESTAMP_MODE = 'timestamps'
+BOARD_MODES = (TEXT_MODE, TIMESTAMP_MODE)
+
+# Boards with at least this many rows are rendered through tzbatch when numpy is available
+BATCH_MIN_ROWS = 64
+
+# Memory the render cache may use for cached messages
+RENDER_CACHE_BYTES = 16 * 1024 * 1024
+
+def timestamp_row(label, tz, instant):
+    """Builds a row from the zone's offset and its next transition as Discord timestamp markup."""
+    offset = tzengine.offset_cache.offset(tz, instant)
+    abbreviation = tzengine.get_zone(tz).abbreviation_at(instant)
+    row = f"`{label:<20}` {tzengine.fixed_offset_name(offset)} {abbreviation}"
+    next_change = tzengine.offset_cache.valid_until(tz, instant)
+    if next_change != tzengine.FOREVER:
+        row += f" · changes <t:{next_change}:R>"
+    return row + "\n"
+
+def rsgame_timestamp_message(instant):
+    """Builds the client-rendered Runescape Game Time message."""
+    return timestamp_row("Runescape Game Time", 'Europe/London', instant)
+
+def usable_rows(rows):
+    """Returns the (label, timezone) rows whose timezone is known, skipping any others."""
+    return [row for row in rows if tzengine.is_known(row[1])]
+
+def clock_parts(timezones, instant):
+    """Returns the MONTH_DAY index and minute of the day of every sorted (label, timezone) row."""
+    if tzbatch is not None and len(timezones) >= BATCH_MIN_ROWS:
+        # Large boards convert every row in one vectorized call
+        return tzbatch.table_indices(tzbatch.convert([tz for _, tz in timezones], instant))
+    offset = tzengine.offset_cache.offset
+    dates = []
+    minutes = []
+    for _, tz in timezones:
+        days, seconds = divmod(instant + offset(tz, instant), 86400)
+        dates.append(timefmt.date_index(days))
+        minutes.append(seconds // 60)
+    return dates, minutes
+
+def render_timezones(zones, mode, instant):
+    """Builds the world clock pages for a zone cache snapshot at instant, bypassing the cache."""
+    # Rows saved before zones were validated may name unknown zones; they are left out
+    rows = usable_rows(zones.rows)
+    if not rows:
+        return ("```",)
+
+    # Sort timezones based on UTC offset, reusing the order until the next DST transition
+    timezones = tzengine.offset_cache.sorted_rows(rows, instant, key=('zones', zones.fingerprint))
+
+    if mode == TIMESTAMP_MODE:
+        # Client-rendered rows only change when the zone list or an offset changes; Discord
+        # only renders timestamp markup outside of code blocks, so pages are split by line
+        return layout.split_lines([timestamp_row(label, tz, instant) for label, tz in timezones])
+
+    # Boards too long for one message are packed into columns and split across pages
+    dense = layout.clock_layout(zones.fingerprint, [label for label, _ in timezones])
+    dates, minutes = clock_parts(timezones, instant)
+    if dense is None:
+        # Add sorted timezones to the message, assembled from precomputed fragments
+        rows = [timefmt.clock_row_parts(label, d, m) for (label, _), d, m in zip(timezones, dates, minutes)]
+        return ("```" + "".join(rows) + "```",)
+    width = dense.label_width
+    rows = [timefmt.dense_row_parts(label, width, d, m) for (label, _), d, m in zip(timezones, dates, minutes)]
+    return layout.dense_pages(rows, dense)
+
+def render_rsgame(mode, instant):
+    """Builds the Runescape Game Time page at instant, bypassing the cache."""
+    if mode == TIMESTAMP_MODE:
+        return (rsgame_timestamp_message(instant),)
+
+    message = "```"
+
+    # Runescape Game Time is based on London time
+    game_time = timefmt.time_24h(instant + tzengine.offset_cache.offset('Europe/London', instant))
+
+    message += f"Runescape Game Time is {game_time}\n"
+    message += "```"
+    return (message,)
+
+def next_refresh(kind, mode, timezones, instant):
+    """Returns the epoch instant at which a board's rendered content can next change."""
+    if mode == TIMESTAMP_MODE:
+        # Timestamp boards only change when one of their zones crosses a transition
+        zones = [tz for _, tz in usable_rows(timezones)] if kind == boards.WORLD_CLOCK else ['Europe/London']
+        return min((tzengine.offset_cache.valid_until(tz, instant) for tz in zones), default=tzengine.FOREVER)
+    # Text boards change at every minute boundary
+    return (instant // 60 + 1) * 60
+
+def _size(pages):
+    return sys.getsizeof(pages) + sum(sys.getsizeof(page) for page in pages)
+
+class RenderCache:
+    """LRU cache of rendered pages, capped by the memory the pages use."""
+
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> tuple of pages
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the pages cached under key, or None."""
+        pages = self._entries.get(key)
+        if pages is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return pages
+
+    def put(self, key, pages):
+        """Caches pages under key, evicting the least recently used renders over the cap."""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= _size(old)
+        self._entries[key] = pages
+        self.bytes += _size(pages)
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= _size(evicted)
+
+    def stats(self):
+        """Returns the hit/miss counters and the cache's size."""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self.bytes}
+
+# Shared by every board and command, so equal zone sets in the same minute render once
+render_cache = RenderCache()
+
+def render_board(kind, zones, mode, instant):
+    """Returns the pages of a board of kind showing zones in mode at instant.
+
+    Each page is the content of one Discord message; most boards have one.
+    Renders are cached on (zone-set fingerprint, mode, UTC minute); every
+    format shown has minute resolution, so the render is the same for any
+    instant within the minute. zones is ignored for Runescape Game Time.
+    """
+    fingerprint = zones.fingerprint if kind == boards.WORLD_CLOCK else kind
+    key = (fingerprint, mode, instant // 60)
+    pages = render_cache.get(key)
+    if pages is None:
+        if kind == boards.WORLD_CLOCK:
+            pages = render_timezones(zones, mode, instant)
+        else:
+            pages = render_rsgame(mode, instant)
+        render_cache.put(key, pages)
+    return pages
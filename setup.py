@@ -5,13 +5,16 @@ setup(
     version='0.1.0',
     description='A Discord bot for showing world clock.',
     author='Zahzr',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=[
         'discord.py',
         'python-dotenv',
         'pytz',
         'aiosqlite',
     ],
+    extras_require={
+        'fast': ['numpy'],
+    },
     entry_points={
         'console_scripts': [
             'worldClock = bot:main',
@@ -0,0 +1,310 @@
+"""Long-lived SQLite connections shared by the bot's commands and loops."""
+from collections import namedtuple
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import sqlite3
+import aiosqlite
+import pytz
+import zoneindex
+
+# Prepared statements kept per connection by the sqlite3 module
+CACHED_STATEMENTS = 256
+
+# Pragmas applied to every connection
+PRAGMAS = (
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+)
+
+async def _create_tables(db):
+    """Creates the original timezones and boards tables."""
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS timezones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            label TEXT NOT NULL,
+            timezone TEXT NOT NULL
+        )
+    ''')
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS boards (
+            message_id INTEGER PRIMARY KEY,
+            guild_id INTEGER,
+            channel_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            mode TEXT NOT NULL
+        )
+    ''')
+
+async def _add_guild_to_timezones(db):
+    """Gives every guild its own timezone list.
+
+    The old global list is copied to every guild that has a saved board and
+    kept under NO_GUILD for DMs. Duplicate labels within a guild are dropped.
+    """
+    await db.execute('''
+        CREATE TABLE timezones_by_guild (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            label TEXT NOT NULL,
+            timezone TEXT NOT NULL
+        )
+    ''')
+    await db.execute("CREATE UNIQUE INDEX idx_timezones_guild_label ON timezones_by_guild (guild_id, label)")
+    await db.execute('''
+        INSERT OR IGNORE INTO timezones_by_guild (guild_id, label, timezone)
+        SELECT ?, label, timezone FROM timezones ORDER BY id
+    ''', (NO_GUILD,))
+    await db.execute('''
+        INSERT OR IGNORE INTO timezones_by_guild (guild_id, label, timezone)
+        SELECT guilds.guild_id, timezones.label, timezones.timezone
+        FROM (SELECT DISTINCT guild_id FROM boards WHERE guild_id IS NOT NULL) AS guilds
+        CROSS JOIN timezones
+        ORDER BY guilds.guild_id, timezones.id
+    ''')
+    await db.execute("DROP TABLE timezones")
+    await db.execute("ALTER TABLE timezones_by_guild RENAME TO timezones")
+    # Covers the board read path: a guild's rows in insertion order without touching the table
+    await db.execute("CREATE INDEX idx_timezones_guild_rows ON timezones (guild_id, id, label, timezone)")
+
+async def _add_pages_to_boards(db):
+    """Stores the continuation messages of boards split across several pages."""
+    # Space-separated message ids after the board's first message
+    await db.execute("ALTER TABLE boards ADD COLUMN pages TEXT NOT NULL DEFAULT ''")
+
+async def _canonicalize_timezones(db):
+    """Replaces stored timezones that pytz rejects with the zone id they resolve to.
+
+    Labels used to be stored as the timezone too, so rows like 'tokyo' become
+    Asia/Tokyo while keeping their label. Timezones pytz accepts, such as EST
+    or GMT, are kept as they are: they are what boards have always shown.
+    Rows that cannot be resolved are kept and skipped when boards are rendered.
+    """
+    async with db.execute("SELECT DISTINCT timezone FROM timezones") as cursor:
+        stored = [timezone for (timezone,) in await cursor.fetchall()]
+    updates = []
+    for timezone in stored:
+        try:
+            pytz.timezone(timezone)
+            continue
+        except pytz.UnknownTimeZoneError:
+            pass
+        zone = zoneindex.resolve(timezone)
+        if zone is not None and zone != timezone:
+            updates.append((zone, timezone))
+    await db.executemany("UPDATE timezones SET timezone = ? WHERE timezone = ?", updates)
+
+async def _add_zone_lists(db):
+    """Records which guilds and DM channels have a timezone list of their own.
+
+    The others show the list kept under NO_GUILD, which holds the single
+    list of installs from before lists were per guild. Lists that already
+    have rows are owned, and stay owned once every row is removed.
+    """
+    await db.execute("CREATE TABLE zone_lists (guild_id INTEGER PRIMARY KEY)")
+    await db.execute("INSERT INTO zone_lists (guild_id) SELECT DISTINCT guild_id FROM timezones WHERE guild_id != ?", (NO_GUILD,))
+
+# Schema migrations in the order they are applied; PRAGMA user_version counts how many have run
+MIGRATIONS = (
+    _create_tables,
+    _add_guild_to_timezones,
+    _add_pages_to_boards,
+    _canonicalize_timezones,
+    _add_zone_lists,
+)
+
+class Database:
+    """One writer connection plus a pool of read-only connections, all in WAL mode.
+
+    Opening a connection starts a worker thread and re-reads the schema, so
+    connections are opened once at startup and reused by every command and
+    tick. Writes go through the single writer, one transaction at a time;
+    reads take any idle reader, which WAL lets run alongside the writer.
+    """
+
+    def __init__(self, path, readers=2):
+        self.path = path
+        self.reader_count = readers
+        self._writer = None
+        self._readers = None
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def is_open(self):
+        return self._writer is not None
+
+    async def _connect(self):
+        db = await aiosqlite.connect(self.path, cached_statements=CACHED_STATEMENTS)
+        for pragma in PRAGMAS:
+            await self._pragma(db, pragma)
+        return db
+
+    @staticmethod
+    async def _pragma(db, pragma):
+        # Some pragmas return a row; closing the cursor releases the statement's lock
+        async with db.execute(pragma):
+            pass
+
+    async def open(self):
+        """Opens the writer and reader connections. Does nothing if already open."""
+        if self.is_open:
+            return
+        self._writer = await self._connect()
+        await self._pragma(self._writer, "PRAGMA journal_mode = WAL")
+        self._readers = asyncio.Queue()
+        for _ in range(self.reader_count):
+            reader = await self._connect()
+            await self._pragma(reader, "PRAGMA query_only = ON")
+            self._readers.put_nowait(reader)
+
+    async def close(self):
+        """Waits for in-flight queries to finish and closes every connection."""
+        if not self.is_open:
+            return
+        async with self._write_lock:
+            await self._writer.close()
+            self._writer = None
+        for _ in range(self.reader_count):
+            reader = await self._readers.get()
+            await reader.close()
+
+    async def migrate(self, migrations=MIGRATIONS):
+        """Applies the migrations the database has not run yet, each in its own transaction."""
+        async with self.transaction() as db:
+            async with db.execute("PRAGMA user_version") as cursor:
+                (version,) = await cursor.fetchone()
+        for number, migration in enumerate(migrations[version:], start=version + 1):
+            async with self.transaction() as db:
+                # DDL does not open a transaction implicitly, so begin one explicitly
+                await db.execute("BEGIN")
+                await migration(db)
+                await db.execute(f"PRAGMA user_version = {number}")
+            print(f"Applied database migration {number}: {migration.__name__}")
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Yields the writer connection and commits when the block exits, or rolls back on error."""
+        async with self._write_lock:
+            try:
+                yield self._writer
+                await self._writer.commit()
+            except BaseException:
+                await self._writer.rollback()
+                raise
+
+    async def fetchall(self, sql, params=()):
+        """Runs a read query on an idle reader connection and returns all rows."""
+        reader = await self._readers.get()
+        try:
+            async with reader.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+        finally:
+            self._readers.put_nowait(reader)
+
+# An immutable view of one guild's tracked timezones; version changes whenever rows do,
+# while the fingerprint identifies the rows themselves and is shared by equal zone sets
+ZoneSnapshot = namedtuple('ZoneSnapshot', 'version rows fingerprint')
+
+def fingerprint(rows):
+    """Returns a compact digest identifying a sequence of (label, timezone) rows."""
+    return hashlib.blake2b(repr(tuple(rows)).encode(), digest_size=16).digest()
+
+# The single list of installs from before lists were per guild. It is read-only: guilds and DM
+# channels without a list of their own show it until their first change copies it
+NO_GUILD = 0
+
+class ZoneCache:
+    """Write-through in-memory copy of the timezones table, per zone list.
+
+    A list belongs to a guild, keyed by the guild id, or to a DM channel,
+    keyed by the channel id; snowflakes never collide, so both share the
+    table's guild_id column. The table is read once at startup. Writes go to
+    SQLite first and then replace the list's snapshot, so refresh loops read
+    the current zone list with no I/O. Versions are unique across lists, so
+    anything derived from a snapshot can be keyed on its version alone.
+
+    A list that was never changed shows the NO_GUILD list, which is where
+    upgraded installs keep their original list. Its first add or remove
+    copies that list, and the guild or channel owns its copy from then on.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self._lists = {}  # list id -> ZoneSnapshot, for NO_GUILD and every owned list
+        self._version = 0
+
+    def snapshot(self, list_id):
+        """Returns the current ZoneSnapshot of list_id, falling back to the NO_GUILD list."""
+        snapshot = self._lists.get(list_id)
+        if snapshot is None:
+            return self._lists.get(NO_GUILD, _EMPTY)
+        return snapshot
+
+    def _replace(self, list_id, rows):
+        self._version += 1
+        rows = tuple(rows)
+        self._lists[list_id] = ZoneSnapshot(self._version, rows, fingerprint(rows))
+
+    async def load(self):
+        """Reads the timezones table into the cache."""
+        owners = await self.database.fetchall("SELECT guild_id FROM zone_lists")
+        rows = await self.database.fetchall("SELECT guild_id, label, timezone FROM timezones ORDER BY guild_id, id")
+        lists = {list_id: [] for (list_id,) in owners}
+        for list_id, label, timezone in rows:
+            lists.setdefault(list_id, []).append((label, timezone))
+        self._lists = {}
+        for list_id, list_rows in lists.items():
+            self._replace(list_id, list_rows)
+
+    async def _own(self, db, list_id):
+        """Copies the NO_GUILD list to list_id within a write transaction, if it has no list yet.
+
+        Returns the list's rows before the write.
+        """
+        if not list_id:
+            raise ValueError("The NO_GUILD list is read-only.")
+        if list_id in self._lists:
+            return self._lists[list_id].rows
+        await db.execute("INSERT INTO zone_lists (guild_id) VALUES (?)", (list_id,))
+        await db.execute(
+            "INSERT INTO timezones (guild_id, label, timezone) SELECT ?, label, timezone FROM timezones WHERE guild_id = ? ORDER BY id",
+            (list_id, NO_GUILD),
+        )
+        return self.snapshot(NO_GUILD).rows
+
+    async def add(self, list_id, label, timezone):
+        """Stores a new (label, timezone) row in list_id. Returns False if the label is taken."""
+        try:
+            async with self.database.transaction() as db:
+                rows = await self._own(db, list_id) + ((label, timezone),)
+                await db.execute(
+                    "INSERT INTO timezones (guild_id, label, timezone) VALUES (?, ?, ?)", (list_id, label, timezone)
+                )
+        except sqlite3.IntegrityError:
+            return False
+        self._replace(list_id, rows)
+        return True
+
+    async def remove(self, list_id, label):
+        """Deletes list_id's row with label and returns how many rows were removed."""
+        if not any(row[0] == label for row in self.snapshot(list_id).rows):
+            return 0
+        async with self.database.transaction() as db:
+            # Read under the write lock, so a concurrent add is not dropped from the cache
+            current = await self._own(db, list_id)
+            rows = [row for row in current if row[0] != label]
+            await db.execute("DELETE FROM timezones WHERE guild_id = ? AND label = ?", (list_id, label))
+        self._replace(list_id, rows)
+        return len(current) - len(rows)
+
+    def stats(self):
+        """Returns the latest snapshot version, the number of lists and the number of cached rows."""
+        return {
+            'version': self._version,
+            'lists': len(self._lists),
+            'size': sum(len(snapshot.rows) for snapshot in self._lists.values()),
+        }
+
+_EMPTY = ZoneSnapshot(0, (), fingerprint(()))
@@ -0,0 +1,144 @@
+"""Supervision of the bot's background loops."""
+import asyncio
+import functools
+import time
+
+# Restart delays after consecutive failures: 1s, 2s, 4s, ... up to 5 minutes
+BASE_DELAY = 1.0
+MAX_DELAY = 300.0
+
+# A running loop with no successful iteration for this long is considered stalled and restarted
+STALL_AFTER = 180.0
+
+# Seconds between watchdog checks
+WATCHDOG_PERIOD = 30.0
+
+class LoopHealth:
+    """Counters and timestamps of one supervised loop."""
+    __slots__ = ('last_success', 'last_error', 'failures', 'restarts', 'restart_pending')
+
+    def __init__(self):
+        self.last_success = None  # time.time() of the last iteration that completed
+        self.last_error = None
+        self.failures = 0  # Consecutive failures, reset by a successful iteration
+        self.restarts = 0
+        self.restart_pending = False
+
+class Supervisor:
+    """Starts discord.ext.tasks loops exactly once and keeps them running.
+
+    A loop that raises is restarted after an exponential backoff, and a
+    watchdog restarts loops that stopped or stopped completing iterations.
+    Starting an already running supervisor does nothing, so it is safe to
+    call from hooks that may run more than once.
+    """
+
+    def __init__(self, base_delay=BASE_DELAY, max_delay=MAX_DELAY, stall_after=STALL_AFTER):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stall_after = stall_after
+        self._loops = {}  # name -> tasks.Loop
+        self._health = {}  # name -> LoopHealth
+        self._watchdog = None
+
+    def add(self, name, loop):
+        """Supervises loop under name. Must be called before start."""
+        health = self._health[name] = LoopHealth()
+        self._loops[name] = loop
+        coro = loop.coro
+
+        @functools.wraps(coro)
+        async def tracked(*args, **kwargs):
+            result = await coro(*args, **kwargs)
+            health.last_success = time.time()
+            health.failures = 0
+            return result
+
+        async def on_error(error):
+            health.failures += 1
+            health.last_error = repr(error)
+            delay = min(self.max_delay, self.base_delay * 2 ** (health.failures - 1))
+            print(f"Loop {name} failed ({error!r}), restarting in {delay:.0f}s.")
+            self._schedule_restart(name, delay)
+
+        loop.coro = tracked
+        loop.error(on_error)
+        return loop
+
+    def start(self):
+        """Starts every loop that is not running and the watchdog. Does nothing if already started."""
+        if self._watchdog is not None and not self._watchdog.done():
+            return
+        for name, loop in self._loops.items():
+            if not loop.is_running():
+                loop.start()
+            # Count the start as a success so a loop that never completes an iteration is caught
+            self._health[name].last_success = time.time()
+        self._watchdog = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        """Stops the watchdog and cancels every loop."""
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        for loop in self._loops.values():
+            loop.cancel()
+
+    def _schedule_restart(self, name, delay):
+        health = self._health[name]
+        if health.restart_pending:
+            return
+        health.restart_pending = True
+        asyncio.get_running_loop().call_later(delay, self._restart, name)
+
+    def _restart(self, name):
+        health = self._health[name]
+        health.restart_pending = False
+        loop = self._loops[name]
+        if loop.is_running():
+            return
+        task = loop.get_task()
+        if task is not None and not task.cancelled():
+            task.exception()  # Already reported by on_error; retrieving it silences asyncio
+        health.restarts += 1
+        loop.start()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(WATCHDOG_PERIOD)
+            now = time.time()
+            for name, loop in self._loops.items():
+                health = self._health[name]
+                if health.restart_pending:
+                    continue
+                if not loop.is_running():
+                    print(f"Loop {name} is not running, restarting it.")
+                    self._restart(name)
+                elif now - health.last_success > self.stall_after:
+                    print(f"Loop {name} has not completed an iteration in {now - health.last_success:.0f}s, restarting it.")
+                    health.restarts += 1
+                    health.last_success = now
+                    loop.restart()
+
+    def health(self):
+        """Returns each loop's state, last success time, consecutive failures and restart count."""
+        now = time.time()
+        report = {}
+        for name, loop in self._loops.items():
+            health = self._health[name]
+            if health.restart_pending:
+                state = 'restarting'
+            elif not loop.is_running():
+                state = 'stopped'
+            elif health.last_success is not None and now - health.last_success > self.stall_after:
+                state = 'stalled'
+            else:
+                state = 'healthy'
+            report[name] = {
+                'state': state,
+                'last_success': health.last_success,
+                'failures': health.failures,
+                'restarts': health.restarts,
+                'last_error': health.last_error,
+            }
+        return report
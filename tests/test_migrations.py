@@ -0,0 +1,104 @@
+"""Upgrades of databases written by earlier versions of the bot."""
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+import storage
+
+# The only table of the original bot, which stored each label as its own timezone
+BASELINE_SCHEMA = '''
+    CREATE TABLE timezones (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        label TEXT NOT NULL,
+        timezone TEXT NOT NULL
+    )
+'''
+
+def baseline_database(path, labels):
+    """Writes a database as the original bot left it, with one row per label."""
+    with sqlite3.connect(path) as db:
+        db.execute(BASELINE_SCHEMA)
+        db.executemany("INSERT INTO timezones (label, timezone) VALUES (?, ?)", [(label, label) for label in labels])
+    db.close()
+
+class BaselineMigrationTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'timezones.db')
+        self.database = storage.Database(self.path)
+
+    async def asyncTearDown(self):
+        await self.database.close()
+        self.directory.cleanup()
+
+    async def migrate(self, labels):
+        baseline_database(self.path, labels)
+        await self.database.open()
+        await self.database.migrate()
+        return await self.database.fetchall("SELECT guild_id, label, timezone FROM timezones ORDER BY id")
+
+    async def test_zones_pytz_accepts_are_kept(self):
+        rows = await self.migrate(['EST', 'GMT', 'MST', 'Europe/London'])
+        self.assertEqual([(label, timezone) for _, label, timezone in rows], [
+            ('EST', 'EST'), ('GMT', 'GMT'), ('MST', 'MST'), ('Europe/London', 'Europe/London'),
+        ])
+
+    async def test_names_pytz_rejects_are_resolved(self):
+        rows = await self.migrate(['tokyo', 'UTC+5:30', 'nowhere'])
+        self.assertEqual([(label, timezone) for _, label, timezone in rows], [
+            ('tokyo', 'Asia/Tokyo'), ('UTC+5:30', 'UTC+05:30'), ('nowhere', 'nowhere'),
+        ])
+
+    async def test_guilds_without_rows_show_the_legacy_list(self):
+        await self.migrate(['Europe/London', 'tokyo'])
+        zones = storage.ZoneCache(self.database)
+        await zones.load()
+        legacy = (('Europe/London', 'Europe/London'), ('tokyo', 'Asia/Tokyo'))
+        self.assertEqual(zones.snapshot(1234).rows, legacy)
+        self.assertEqual(zones.snapshot(storage.NO_GUILD).rows, legacy)
+
+    async def test_first_change_copies_the_legacy_list(self):
+        await self.migrate(['Europe/London', 'tokyo'])
+        zones = storage.ZoneCache(self.database)
+        await zones.load()
+        self.assertEqual(await zones.remove(1234, 'tokyo'), 1)
+        self.assertTrue(await zones.add(5678, 'Asia/Kolkata', 'Asia/Kolkata'))
+        self.assertFalse(await zones.add(9012, 'tokyo', 'Asia/Tokyo'))
+        await zones.remove(1234, 'Europe/London')
+
+        # Reloaded, so the copies and the emptied list come from the database
+        zones = storage.ZoneCache(self.database)
+        await zones.load()
+        self.assertEqual(zones.snapshot(1234).rows, ())
+        self.assertEqual(zones.snapshot(5678).rows, (
+            ('Europe/London', 'Europe/London'), ('tokyo', 'Asia/Tokyo'), ('Asia/Kolkata', 'Asia/Kolkata'),
+        ))
+        self.assertEqual(zones.snapshot(9012).rows, zones.snapshot(storage.NO_GUILD).rows)
+        self.assertEqual(len(zones.snapshot(storage.NO_GUILD).rows), 2)
+
+    async def test_dm_lists_leave_the_legacy_list_alone(self):
+        await self.migrate(['Europe/London'])
+        zones = storage.ZoneCache(self.database)
+        await zones.load()
+        dm_channel = 4321
+        self.assertTrue(await zones.add(dm_channel, 'tokyo', 'Asia/Tokyo'))
+        self.assertEqual(await zones.remove(dm_channel, 'Europe/London'), 1)
+        self.assertEqual(zones.snapshot(dm_channel).rows, (('tokyo', 'Asia/Tokyo'),))
+        self.assertEqual(zones.snapshot(222).rows, (('Europe/London', 'Europe/London'),))
+        with self.assertRaises(ValueError):
+            await zones.add(storage.NO_GUILD, 'tokyo', 'Asia/Tokyo')
+
+    async def test_concurrent_add_and_remove_keep_both(self):
+        await self.migrate(['Europe/London', 'tokyo'])
+        zones = storage.ZoneCache(self.database)
+        await zones.load()
+        await asyncio.gather(zones.add(1, 'Asia/Kolkata', 'Asia/Kolkata'), zones.remove(1, 'Europe/London'))
+        expected = (('tokyo', 'Asia/Tokyo'), ('Asia/Kolkata', 'Asia/Kolkata'))
+        self.assertEqual(zones.snapshot(1).rows, expected)
+        await zones.load()
+        self.assertEqual(zones.snapshot(1).rows, expected)
+
+if __name__ == "__main__":
+    unittest.main()
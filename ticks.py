@@ -0,0 +1,53 @@
+"""One clock tick shared by every time-driven board type.
+
+A single loop takes one UTC instant per tick and publishes it to each
+subscribed board type. The bus pops the type's due boards, renders each
+distinct board content once for the tick, hands the pages to the edit path
+and reschedules the boards. Adding a board type is one subscribe call; it
+needs no loop, timer or state of its own.
+"""
+from collections import namedtuple
+
+# key(board) groups boards that show the same content; render(board, instant) returns (pages, next_due)
+BoardType = namedtuple('BoardType', 'key render')
+
+class TickBus:
+    """Publishes clock ticks to the board types subscribed to it."""
+
+    def __init__(self, registry, deliver):
+        self.registry = registry
+        self.deliver = deliver  # Callable taking (board, pages), returning True if an edit was queued
+        self._types = {}  # kind -> BoardType
+
+    def subscribe(self, kind, key, render):
+        """Refreshes boards of kind on every tick, rendering each distinct key once per tick."""
+        self._types[kind] = BoardType(key, render)
+
+    def publish(self, instant):
+        """Refreshes the due boards of every subscribed kind at instant.
+
+        Returns {kind: (edits queued, boards checked)} for the kinds that had due boards.
+        """
+        results = {}
+        for kind, board_type in self._types.items():
+            due = self.registry.pop_due(kind, instant)
+            if not due:
+                continue
+            renders = {}  # key -> (pages, next_due), shared by every board showing the same content
+            edits = 0
+            for board in due:
+                try:
+                    key = board_type.key(board)
+                    rendered = renders.get(key)
+                    if rendered is None:
+                        rendered = renders[key] = board_type.render(board, instant)
+                    pages, next_due = rendered
+                    edits += self.deliver(board, pages)
+                except Exception as e:
+                    # A broken board is retried next minute instead of stopping the tick for every board
+                    print(f"Failed to render board {board.message_id}: {e}")
+                    next_due = (instant // 60 + 1) * 60
+                if self.registry.get(board.message_id) is board:
+                    self.registry.schedule(board, next_due)
+            results[kind] = (edits, len(due))
+        return results
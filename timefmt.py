@@ -0,0 +1,86 @@
+"""Precomputed date and time strings for rendering board rows.
+
+Every string a board can show is built once at import: all 1440 minutes of
+the day in 12- and 24-hour form and all 366 month/day pairs. Rendering a
+row is then integer arithmetic on a local epoch instant plus table lookups,
+instead of a datetime and two strftime calls.
+"""
+
+# '%I:%M %p' and '%H:%M' for every minute of the day
+TIME_12H = tuple(
+    f"{(minute // 60 + 11) % 12 + 1:02d}:{minute % 60:02d} {'PM' if minute >= 720 else 'AM'}"
+    for minute in range(1440)
+)
+TIME_24H = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(1440))
+
+# Days in each month of a leap year, and the index of each month's first day in MONTH_DAY
+_LEAP_MONTH_DAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+MONTH_START = tuple(sum(_LEAP_MONTH_DAYS[:month]) for month in range(12))
+
+# '%m/%d' for every day of a leap year
+MONTH_DAY = tuple(
+    f"{month + 1:02d}/{day + 1:02d}"
+    for month, days in enumerate(_LEAP_MONTH_DAYS)
+    for day in range(days)
+)
+
+def month_day_index(month, day):
+    """Returns the MONTH_DAY index of a 1-based month and day."""
+    return MONTH_START[month - 1] + day - 1
+
+def civil_from_days(days):
+    """Splits days since 1970-01-01 into a proleptic Gregorian (year, month, day).
+
+    Only integer arithmetic is used, so days may be an int or a numpy integer
+    array, which gives arrays of years, months and days.
+    """
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 - 12 * (mp >= 10)
+    return yoe + era * 400 + (month <= 2), month, day
+
+# Board rows only ever span a couple of local dates, so day -> MONTH_DAY index is memoized
+_day_index = {}
+
+def date_index(days):
+    """Returns the MONTH_DAY index for days since 1970-01-01."""
+    index = _day_index.get(days)
+    if index is None:
+        if len(_day_index) > 1024:
+            _day_index.clear()
+        _, month, day = civil_from_days(days)
+        index = _day_index[days] = month_day_index(month, day)
+    return index
+
+# Row fragments: the padded label column and the padded date column
+_DATE_COLUMN = tuple(f"{date:<7} | " for date in MONTH_DAY)
+_label_columns = {}
+
+def label_column(label):
+    """Returns the padded label column of a clock row, cached per label."""
+    column = _label_columns.get(label)
+    if column is None:
+        if len(_label_columns) > 65536:
+            _label_columns.clear()
+        column = _label_columns[label] = f"{label:<20} | "
+    return column
+
+def clock_row_parts(label, date, minute):
+    """Returns a world clock row from a MONTH_DAY index and a minute of the day."""
+    return label_column(label) + _DATE_COLUMN[date] + TIME_12H[minute] + "\n"
+
+# Dense rows (see layout.py) pad labels to the longest label and drop the date column's padding
+_DENSE_DATE_COLUMN = tuple(f"{date} | " for date in MONTH_DAY)
+
+def dense_row_parts(label, label_width, date, minute):
+    """Returns a dense world clock row, without a newline, from a MONTH_DAY index and a minute of the day."""
+    return f"{label:<{label_width}} | " + _DENSE_DATE_COLUMN[date] + TIME_12H[minute]
+
+def time_24h(local):
+    """Returns '%H:%M' for the local epoch instant local."""
+    return TIME_24H[local % 86400 // 60]
@@ -0,0 +1,98 @@
+"""Hierarchical timer wheel with O(1) schedule and cancel.
+
+Level 0 has one slot per second for the next 256 seconds, level 1 one slot
+per 256 seconds for the current ~18-hour window, and level 2 one slot per
+~18 hours; timers further out wait in an overflow set. Advancing the clock
+visits one level-0 slot per second and, whenever a window rolls over,
+re-places the timers of the next higher slot into the levels below. Boards
+refreshed every minute always land directly in level 0 and are never
+re-placed, so the work per tick is proportional to the boards that come due.
+"""
+import time
+
+# Slots per level and number of levels: 256 ** 3 seconds is about 194 days
+WHEEL_SIZE = 256
+WHEEL_LEVELS = 3
+
+class TimerWheel:
+    """Maps keys to the whole epoch second they are due at."""
+
+    def __init__(self, start=None, size=WHEEL_SIZE, levels=WHEEL_LEVELS):
+        self.size = size
+        self.current = int(time.time()) if start is None else int(start)
+        self._spans = [size ** level for level in range(levels + 1)]
+        self._levels = [[set() for _ in range(size)] for _ in range(levels)]
+        self._overflow = set()
+        self._expired = set()  # Keys scheduled at or before current, returned by the next advance
+        self._where = {}  # key -> the set holding it
+        self._due = {}  # key -> due epoch second
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def _place(self, key, due):
+        delta = due - self.current
+        if delta <= 0:
+            bucket = self._expired
+        elif delta < self.size:
+            # Within one turn of level 0, every slot is visited before it comes round again
+            bucket = self._levels[0][due % self.size]
+        else:
+            for level in range(1, len(self._levels)):
+                span = self._spans[level + 1]
+                # Same window of the level above: the slot is still ahead of the clock
+                if due // span == self.current // span:
+                    bucket = self._levels[level][due // self._spans[level] % self.size]
+                    break
+            else:
+                bucket = self._overflow
+        bucket.add(key)
+        self._where[key] = bucket
+        self._due[key] = due
+
+    def schedule(self, key, due):
+        """Sets key to come due at the epoch second due, replacing any earlier schedule."""
+        self.cancel(key)
+        self._place(key, int(due))
+
+    def cancel(self, key):
+        """Unschedules key. Returns True if it was scheduled."""
+        bucket = self._where.pop(key, None)
+        if bucket is None:
+            return False
+        bucket.discard(key)
+        del self._due[key]
+        return True
+
+    def _cascade(self, bucket):
+        keys = list(bucket)
+        bucket.clear()
+        for key in keys:
+            self._place(key, self._due[key])
+
+    def advance(self, instant):
+        """Moves the clock to instant and returns the keys due at or before it, unscheduling them."""
+        due = list(self._expired)
+        self._expired.clear()
+        instant = int(instant)
+        while self.current < instant:
+            self.current += 1
+            # Roll over the higher levels whose window starts now, highest first
+            for level in range(len(self._levels), 0, -1):
+                if self.current % self._spans[level] == 0:
+                    if level == len(self._levels):
+                        self._cascade(self._overflow)
+                    else:
+                        self._cascade(self._levels[level][self.current // self._spans[level] % self.size])
+            bucket = self._levels[0][self.current % self.size]
+            due.extend(bucket)
+            bucket.clear()
+            due.extend(self._expired)
+            self._expired.clear()
+        for key in due:
+            del self._where[key]
+            del self._due[key]
+        return due
@@ -0,0 +1,76 @@
+"""Vectorized conversion of many tracked zones at a single instant.
+
+Requires numpy. The transitions of every distinct zone are packed into one
+padded matrix, so a whole board is converted with a handful of array
+operations instead of a pytz conversion and two strftime calls per row.
+"""
+from collections import namedtuple
+import numpy as np
+import timefmt
+import tzengine
+
+# Per-row results of a batch conversion, all numpy arrays of equal length
+BatchResult = namedtuple('BatchResult', 'local offsets year month day minute_of_day')
+
+# Drop all cached converters once this many distinct zone lists are cached
+MAX_CACHED_CONVERTERS = 256
+
+_PAD = np.iinfo(np.int64).max
+_MONTH_START = np.array(timefmt.MONTH_START, dtype=np.int64)
+
+class TransitionMatrix:
+    """Padded (zones x transitions) arrays of instants and offsets."""
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        zones = [tzengine.get_zone(name) for name in self.names]
+        width = max((len(zone.instants) for zone in zones), default=1)
+        self.instants = np.full((len(zones), width), _PAD, dtype=np.int64)
+        self.offsets = np.zeros((len(zones), width), dtype=np.int64)
+        for i, zone in enumerate(zones):
+            n = len(zone.instants)
+            self.instants[i, :n] = zone.instants
+            self.offsets[i, :n] = zone.offsets
+            self.offsets[i, n:] = zone.offsets[-1]
+        self._rows = np.arange(len(zones))
+
+    def offsets_at(self, instant):
+        """Returns each zone's UTC offset in seconds at the given epoch instant."""
+        index = (self.instants <= instant).sum(axis=1) - 1
+        np.maximum(index, 0, out=index)
+        return self.offsets[self._rows, index]
+
+class BatchConverter:
+    """Converts a fixed list of row zones (duplicates allowed) at any instant."""
+
+    def __init__(self, row_zones):
+        distinct = list(dict.fromkeys(row_zones))
+        position = {name: i for i, name in enumerate(distinct)}
+        self.matrix = TransitionMatrix(distinct)
+        self.row_index = np.fromiter((position[name] for name in row_zones), dtype=np.intp, count=len(row_zones))
+
+    def convert(self, instant):
+        """Returns a BatchResult for every row at the given epoch instant."""
+        offsets = self.matrix.offsets_at(instant)[self.row_index]
+        local = offsets + instant
+        days, seconds = np.divmod(local, 86400)
+        year, month, day = timefmt.civil_from_days(days)
+        return BatchResult(local, offsets, year, month, day, seconds // 60)
+
+# Converters, keyed by the tuple of row zones they were built for
+_converters = {}
+
+def convert(row_zones, instant):
+    """Converts every zone in row_zones at the given epoch instant in one call."""
+    row_zones = tuple(row_zones)
+    converter = _converters.get(row_zones)
+    if converter is None:
+        if len(_converters) >= MAX_CACHED_CONVERTERS:
+            _converters.clear()
+        converter = _converters[row_zones] = BatchConverter(row_zones)
+    return converter.convert(instant)
+
+def table_indices(result):
+    """Returns the timefmt.MONTH_DAY index and minute of the day of every row, as lists."""
+    dates = _MONTH_START[result.month - 1] + result.day - 1
+    return dates.tolist(), result.minute_of_day.tolist()
@@ -0,0 +1,196 @@
+"""Precompiled UTC-offset tables for the tracked timezones.
+
+Each zone's IANA transitions are compiled once into sorted arrays of
+(utc_instant, offset, abbreviation), so finding the offset at an instant
+is a binary search instead of a pytz conversion.
+"""
+from bisect import bisect_right
+from datetime import datetime
+import re
+import time
+import pytz
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _epoch_seconds(dt):
+    """Converts a naive UTC datetime to integer epoch seconds."""
+    return int((dt - _EPOCH).total_seconds())
+
+# pytz marks "since the beginning of time" with datetime.min
+MIN_INSTANT = _epoch_seconds(datetime.min)
+
+class CompiledZone:
+    """A timezone's transitions as parallel sorted arrays."""
+    __slots__ = ('name', 'instants', 'offsets', 'abbreviations')
+
+    def __init__(self, name, instants, offsets, abbreviations):
+        self.name = name
+        self.instants = instants
+        self.offsets = offsets
+        self.abbreviations = abbreviations
+
+    def index_at(self, instant):
+        """Returns the index of the transition in effect at the given epoch instant."""
+        return max(bisect_right(self.instants, instant) - 1, 0)
+
+    def offset_at(self, instant):
+        """Returns the UTC offset in seconds at the given epoch instant."""
+        return self.offsets[self.index_at(instant)]
+
+    def abbreviation_at(self, instant):
+        """Returns the zone abbreviation (e.g. BST) at the given epoch instant."""
+        return self.abbreviations[self.index_at(instant)]
+
+# Fixed offsets such as UTC+5:30, GMT-03 or +0100; the offset is the time east of UTC
+_FIXED_OFFSET = re.compile(r'^(?:UTC|GMT)?\s*([+-])\s*(\d{1,2})(?::?(\d{2}))?$', re.IGNORECASE)
+
+def parse_fixed_offset(text):
+    """Returns the offset in seconds written in text, or None if text is not a fixed offset."""
+    match = _FIXED_OFFSET.match(text.strip())
+    if match is None:
+        return None
+    sign, hours, minutes = match.groups()
+    hours, minutes = int(hours), int(minutes or 0)
+    if hours > 14 or minutes >= 60:
+        return None
+    seconds = (hours * 60 + minutes) * 60
+    return -seconds if sign == '-' else seconds
+
+def fixed_offset_name(seconds):
+    """Returns the canonical zone id of a fixed offset, e.g. UTC+05:30, also how boards show offsets."""
+    sign = '-' if seconds < 0 else '+'
+    hours, minutes = divmod(abs(seconds) // 60, 60)
+    return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+def compile_zone(name):
+    """Builds a CompiledZone from the pytz database entry for name."""
+    offset = parse_fixed_offset(name)
+    if offset is not None:
+        # Fixed offsets never change, so they skip the tz database entirely
+        return CompiledZone(name, [MIN_INSTANT], [offset], [name])
+    tz_info = pytz.timezone(name)
+    transitions = getattr(tz_info, '_utc_transition_times', None)
+    if transitions:
+        instants = [_epoch_seconds(dt) for dt in transitions]
+        offsets = [int(info[0].total_seconds()) for info in tz_info._transition_info]
+        abbreviations = [info[2] for info in tz_info._transition_info]
+    else:
+        # Static zones (UTC, Etc/GMT+5, ...) have a single fixed offset
+        instants = [MIN_INSTANT]
+        offsets = [int(tz_info.utcoffset(datetime(2000, 1, 1)).total_seconds())]
+        abbreviations = [tz_info.tzname(datetime(2000, 1, 1))]
+    return CompiledZone(name, instants, offsets, abbreviations)
+
+# Compiled zones, keyed by IANA name
+_zones = {}
+
+def get_zone(name):
+    """Returns the compiled zone for name, compiling it on first use."""
+    zone = _zones.get(name)
+    if zone is None:
+        zone = _zones[name] = compile_zone(name)
+    return zone
+
+# Names that failed to compile, e.g. typos saved before zones were validated
+_unknown = set()
+
+def is_known(name):
+    """Returns True if name compiles to a zone. Unknown names are reported once."""
+    if name in _zones:
+        return True
+    if name in _unknown:
+        return False
+    try:
+        get_zone(name)
+    except pytz.UnknownTimeZoneError:
+        print(f"Unknown timezone {name}, skipping it.")
+        _unknown.add(name)
+        return False
+    return True
+
+def now():
+    """Returns the current UTC instant in whole epoch seconds.
+
+    Callers take this once per tick and pass it to every lookup so all rows
+    of a board agree on the same instant.
+    """
+    return int(time.time())
+
+def offset_at(name, instant):
+    """Returns the UTC offset of zone name in seconds at the given epoch instant."""
+    return get_zone(name).offset_at(instant)
+
+# Upper bound for zones with no further transitions in the database
+FOREVER = float('inf')
+
+# Drop all cached board orders once this many distinct zone lists are cached
+MAX_CACHED_ORDERS = 4096
+
+class OffsetCache:
+    """Caches each zone's offset and each board's sort order until the next transition.
+
+    An offset is valid from the transition that started it until the next
+    one, so between DST changes every lookup is a dict hit and a board's
+    offset-sorted row order can be reused as-is.
+    """
+
+    def __init__(self):
+        self._offsets = {}  # zone name -> (offset, valid_from, valid_until)
+        self._orders = {}  # rows tuple or caller key -> (sorted rows, valid_from, valid_until)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, name, instant):
+        entry = self._offsets.get(name)
+        if entry is not None and entry[1] <= instant < entry[2]:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        zone = get_zone(name)
+        i = zone.index_at(instant)
+        valid_until = zone.instants[i + 1] if i + 1 < len(zone.instants) else FOREVER
+        entry = self._offsets[name] = (zone.offsets[i], zone.instants[i], valid_until)
+        return entry
+
+    def offset(self, name, instant):
+        """Returns the UTC offset of zone name in seconds at the given epoch instant."""
+        return self._entry(name, instant)[0]
+
+    def valid_until(self, name, instant):
+        """Returns the epoch instant of zone name's next transition, or FOREVER."""
+        return self._entry(name, instant)[2]
+
+    def sorted_rows(self, rows, instant, tz_index=1, key=None):
+        """Returns rows sorted by the UTC offset of the zone in column tz_index.
+
+        The order is reused until any of the zones crosses a transition. Pass a
+        key (such as a zone list version) to avoid hashing the rows themselves.
+        """
+        rows = tuple(rows)
+        if key is None:
+            key = rows
+        cached = self._orders.get(key)
+        if cached is not None and cached[1] <= instant < cached[2]:
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        entries = {row[tz_index]: self._entry(row[tz_index], instant) for row in rows}
+        ordered = tuple(sorted(rows, key=lambda row: entries[row[tz_index]][0]))
+        valid_from = max((e[1] for e in entries.values()), default=MIN_INSTANT)
+        valid_until = min((e[2] for e in entries.values()), default=FOREVER)
+        if len(self._orders) >= MAX_CACHED_ORDERS:
+            self._orders.clear()
+        self._orders[key] = (ordered, valid_from, valid_until)
+        return ordered
+
+    def stats(self):
+        """Returns the hit/miss counters and the number of cached entries."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'zones': len(self._offsets),
+            'orders': len(self._orders),
+        }
+
+# Shared cache used by the bot's commands and refresh loops
+offset_cache = OffsetCache()
@@ -1,255 +1,495 @@
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
-from datetime import datetime
-import pytz
-import aiosqlite
+import aiohttp
+import math
 import os
 from dotenv import load_dotenv
+import boards
+import dispatch
+import layout
+import profiles
+import render
+import storage
+import supervisor
+import ticks
+import tzengine
+import zoneindex
 
 # Load environment variables
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
-DATABASE = 'timezones.db'
+DATABASE = os.getenv("DATABASE", "timezones.db")
+
+# Boards are refreshed REFRESH_OFFSET seconds after the minute boundary at which their
+# content changes, plus a fixed per-board delay under REFRESH_SPREAD seconds, so edits
+# reach Discord spread over the window instead of all at the boundary. The refresh loop ticks
+# once a second, so a fractional REFRESH_OFFSET is rounded up to whole seconds
+REFRESH_OFFSET = math.ceil(float(os.getenv("REFRESH_OFFSET", "1")))
+REFRESH_SPREAD = int(os.getenv("REFRESH_SPREAD", "20"))
+
+# Seconds before a channel parked for lack of permission is retried with one probe edit
+PARKED_RETRY = float(os.getenv("PARKED_RETRY", "900"))
+
+# Number of board edits sent to Discord at the same time
+EDIT_CONCURRENCY = int(os.getenv("EDIT_CONCURRENCY", "8"))
+
+# Every command is also a slash command. Set PREFIX_COMMANDS=0 to drop the message
+# intents, including privileged message content, once nobody uses the ! prefix, and
+# SYNC_COMMANDS=0 to skip uploading the slash commands to Discord at startup.
+PREFIX_COMMANDS = os.getenv("PREFIX_COMMANDS", "1") == "1"
+SYNC_COMMANDS = os.getenv("SYNC_COMMANDS", "1") == "1"
+
+# Gateway intents and client caches, see profiles.py; 'default' restores discord.py's defaults
+CLIENT_PROFILE = os.getenv("CLIENT_PROFILE", profiles.LEAN_PROFILE)
+
+def rate_limit_trace():
+    """Returns an aiohttp trace that feeds Discord's rate-limit headers to the edit dispatcher."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_end(session, context, params):
+        edit_dispatcher.observe(params.url.path, params.response.status, params.response.headers)
+
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+class WorldClockBot(commands.Bot):
+    """The bot client, extended to start its background services once and shut them down cleanly."""
+
+    async def setup_hook(self):
+        # Runs once after login, unlike on_ready which fires again after every reconnect
+        await start_services()
+        if SYNC_COMMANDS:
+            synced = await self.tree.sync()
+            print(f"Synced {len(synced)} slash commands.")
+
+    async def close(self):
+        await loop_supervisor.stop()
+        await edit_dispatcher.close()
+        await database.close()
+        await super().close()
 
 # Bot setup
-intents = discord.Intents.default()
-intents.message_content = True  # Make sure this is enabled for message content access
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = WorldClockBot(
+    command_prefix="!", http_trace=rate_limit_trace(), **profiles.client_options(CLIENT_PROFILE, PREFIX_COMMANDS)
+)
+
+# Shared SQLite connections, opened by create_db
+database = storage.Database(DATABASE)
+
+# In-memory copy of the timezones table, loaded at startup and updated on every write
+zone_cache = storage.ZoneCache(database)
 
-# Store the message ID and channel ID for the display message
-display_message_info = {}
-rsgame_message_info = {}
+# Live boards kept up to date by the refresh loop
+board_registry = boards.BoardRegistry(offset=REFRESH_OFFSET, spread=REFRESH_SPREAD)
+
+# Edits queued and skipped by the refresh loop, and the REST calls push_board sent along with the
+# fetch_message calls it no longer makes; in total, and for the last tick of each board kind, whose
+# REST counters cover the edits delivered since that tick
+rest_stats = {'edits': 0, 'skipped': 0, 'sent': 0, 'fetches_saved': 0, 'last_tick': {}}
 
 async def create_db():
-    """Creates the database and the table if it doesn't exist."""
+    """Creates the database and applies any pending schema migrations."""
     if not os.path.exists(DATABASE):
         print(f"Database file {DATABASE} does not exist. It will be created.")
     else:
         print(f"Database file {DATABASE} already exists. Loading existing data.")
-    async with aiosqlite.connect(DATABASE) as db:
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS timezones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                label TEXT NOT NULL,
-                timezone TEXT NOT NULL
+    await database.open()
+    await database.migrate()
+
+async def load_boards():
+    """Restores the live boards saved by a previous run into the registry."""
+    rows = await database.fetchall("SELECT guild_id, channel_id, message_id, kind, mode, pages FROM boards")
+    # Restored boards are due immediately; their last content is unknown
+    board_registry.load(
+        boards.Board(guild_id, channel_id, message_id, kind, mode, pages=map(int, pages.split()))
+        for guild_id, channel_id, message_id, kind, mode, pages in rows
+    )
+    print(f"Loaded {len(rows)} live boards.")
+
+async def save_boards():
+    """Writes board registrations and removals since the last save in one transaction."""
+    saved, removed = board_registry.take_changes()
+    if not saved and not removed:
+        return
+    try:
+        async with database.transaction() as db:
+            await db.executemany(
+                "INSERT OR REPLACE INTO boards (message_id, guild_id, channel_id, kind, mode, pages) VALUES (?, ?, ?, ?, ?, ?)",
+                [(b.message_id, b.guild_id, b.channel_id, b.kind, b.mode, " ".join(map(str, b.pages))) for b in saved],
             )
-        ''')
-        await db.commit()
+            await db.executemany("DELETE FROM boards WHERE message_id = ?", [(message_id,) for message_id in removed])
+    except BaseException:
+        # Rolled back, so the next save writes this batch again
+        board_registry.restore_changes(saved, removed)
+        raise
 
 @bot.event
 async def on_ready():
-    """Event that runs when the bot is ready."""
+    """Event that runs when the bot is ready, again after every reconnect."""
     print(f'Logged in as {bot.user.name}')
-    await create_db()  # Ensure the database and table are created
-    display_timezones.start()
-    rsgametime_loop.start()
 
-@bot.command()
-async def addtimezone(ctx, label: str):
+async def start_services():
+    """Opens the database, restores state and starts the supervised refresh loop."""
+    await create_db()  # Ensure the database and table are created
+    await zone_cache.load()
+    await load_boards()
+    edit_dispatcher.start()
+    loop_supervisor.start()
+
+    # Bring restored boards up to date without waiting for the next minute boundary
+    await refresh_boards()
+
+# Mode choices offered by the slash commands; prefix commands take the mode as plain text
+MODE_CHOICES = [app_commands.Choice(name=mode, value=mode) for mode in render.BOARD_MODES]
+
+def zone_list_id(guild_id, channel_id):
+    """Returns the zone_cache key of a guild's timezone list, or of a DM channel's own list."""
+    return guild_id or channel_id
+
+def context_list_id(ctx):
+    """Returns the zone_cache key of the timezone list a command works on."""
+    return zone_list_id(ctx.guild.id if ctx.guild else None, ctx.channel.id)
+
+async def timezone_autocomplete(interaction, current):
+    """Suggests IANA timezone names and aliases starting with what has been typed."""
+    return [app_commands.Choice(name=shown, value=zone) for shown, zone in zoneindex.complete(current)]
+
+async def tracked_autocomplete(interaction, current):
+    """Suggests the guild's tracked labels starting with what has been typed."""
+    current = current.lower()
+    rows = zone_cache.snapshot(zone_list_id(interaction.guild_id, interaction.channel_id)).rows
+    labels = [label for label, _ in rows if label.lower().startswith(current)]
+    return [app_commands.Choice(name=label, value=label) for label in labels[:zoneindex.MAX_CHOICES]]
+
+@bot.hybrid_command()
+@app_commands.autocomplete(timezone=timezone_autocomplete)
+async def addtimezone(ctx, timezone: str, *, label: str = None):
     """Adds a new timezone to the list of tracked timezones."""
-    async with aiosqlite.connect(DATABASE) as db:
-        await db.execute("INSERT INTO timezones (label, timezone) VALUES (?, ?)", (label, label))
-        await db.commit()
-    await ctx.send(f"Timezone {label} added.")
-
-@bot.command()
+    # Store the canonical zone, so boards never meet a name the tz database does not know
+    zone = zoneindex.resolve(timezone)
+    if zone is None:
+        suggestions = ", ".join(shown for shown, _ in zoneindex.complete(timezone, 5))
+        hint = f" Did you mean: {suggestions}?" if suggestions else ""
+        await ctx.send(f"Unknown timezone {timezone}.{hint}")
+        return
+    # Shown as typed, e.g. Tokyo rather than Asia/Tokyo
+    label = label or timezone
+    if len(label) > layout.MAX_LABEL_LENGTH:
+        await ctx.send(f"Labels can be at most {layout.MAX_LABEL_LENGTH} characters long.")
+        return
+
+    guild_id = ctx.guild.id if ctx.guild else None
+    if not await zone_cache.add(context_list_id(ctx), label, zone):
+        await ctx.send(f"Timezone {label} is already tracked.")
+        return
+    board_registry.mark_due(boards.WORLD_CLOCK, tzengine.now(), guild_id)
+    await ctx.send(f"Timezone {label} added." if label == zone else f"Timezone {label} ({zone}) added.")
+
+@bot.hybrid_command()
 async def listtimezones(ctx):
     """Lists all currently tracked timezones."""
-    async with aiosqlite.connect(DATABASE) as db:
-        cursor = await db.execute("SELECT label FROM timezones")
-        timezones = await cursor.fetchall()
-
-    if timezones:
-        message = "```"
-        for tz in timezones:
-            message += f"{tz[0]}\n"
-        message += "```"
-        await ctx.send(message)
-    else:
-        await ctx.send("No timezones are currently tracked.")
+    timezones = zone_cache.snapshot(context_list_id(ctx)).rows
 
-@bot.command()
+    if not timezones:
+        await ctx.send("No timezones are currently tracked.")
+        return
+    lines = [f"{label}\n" if label == tz else f"{label} ({tz})\n" for label, tz in timezones]
+    # Long lists are split over several fenced messages, each within Discord's length limit
+    for page in layout.split_lines(lines, layout.MESSAGE_LIMIT - 2 * len(layout.FENCE)):
+        await ctx.send(layout.FENCE + page + layout.FENCE)
+
+@bot.hybrid_command()
+@app_commands.autocomplete(label=tracked_autocomplete)
 async def removetimezone(ctx, label: str):
     """Removes a timezone from the list of tracked timezones."""
-    async with aiosqlite.connect(DATABASE) as db:
-        await db.execute("DELETE FROM timezones WHERE label = ?", (label,))
-        await db.commit()
+    guild_id = ctx.guild.id if ctx.guild else None
+    await zone_cache.remove(context_list_id(ctx), label)
+    board_registry.mark_due(boards.WORLD_CLOCK, tzengine.now(), guild_id)
     await ctx.send(f"Timezone {label} removed.")
 
-# Function to get the UTC offset for a timezone
-def get_utc_offset(timezone_name):
-    tz_info = pytz.timezone(timezone_name)
-    utc_time = datetime.now(pytz.utc)
-    local_time = utc_time.astimezone(tz_info)
-    offset = local_time.utcoffset().total_seconds() / 3600  # Convert to hours
-    return offset
-
-@bot.command()
-async def displaytimezones(ctx):
-    """Displays the current timezones in the channel and stores the message ID for future updates."""
-    global display_message_info
-    channel = ctx.channel
-
-    # Create the message content
-    message = "```"
-    async with aiosqlite.connect(DATABASE) as db:
-        cursor = await db.execute("SELECT label, timezone FROM timezones")
-        timezones = await cursor.fetchall()
-
-    if timezones:
-        # Sort timezones based on UTC offset
-        timezones.sort(key=lambda x: get_utc_offset(x[1]))
-
-        # Add sorted timezones to the message
-        for label, tz in timezones:
-            tz_info = pytz.timezone(tz)
-            utc_time = datetime.now(pytz.utc)
-            local_time = utc_time.astimezone(tz_info)
-
-            region = label
-            date = local_time.strftime('%m/%d')
-            time = local_time.strftime('%I:%M %p')
-
-            message += f"{region:<20} | {date:<7} | {time}\n"
-        message += "```"
-
-    # Send the message and store the message_id and channel_id for future updates
-    sent_message = await channel.send(message)
-    display_message_info = {'message_id': sent_message.id, 'channel_id': channel.id}
-
-@tasks.loop(seconds=37)
-async def display_timezones():
-    """Updates the timezones message every 15 seconds."""
-    global display_message_info
-
-    # If the message ID is stored, try to update the message
-    if display_message_info.get('message_id') and display_message_info.get('channel_id'):
-        channel = bot.get_channel(display_message_info['channel_id'])
-        if channel:
-            try:
-                message_to_edit = await channel.fetch_message(display_message_info['message_id'])
-                message = "```"
-                async with aiosqlite.connect(DATABASE) as db:
-                    cursor = await db.execute("SELECT label, timezone FROM timezones")
-                    timezones = await cursor.fetchall()
-
-                if timezones:
-                    # Sort timezones based on UTC offset
-                    timezones.sort(key=lambda x: get_utc_offset(x[1]))
-
-                    # Add sorted timezones to the message
-                    for label, tz in timezones:
-                        tz_info = pytz.timezone(tz)
-                        utc_time = datetime.now(pytz.utc)
-                        local_time = utc_time.astimezone(tz_info)
-
-                        region = label
-                        date = local_time.strftime('%m/%d')
-                        time = local_time.strftime('%I:%M %p')
-
-                        message += f"{region:<20} | {date:<7} | {time}\n"
-                    message += "```"
-
-                # Update the message with the new timezone data
-                await message_to_edit.edit(content=message)
-
-            except discord.NotFound:
-                print("Message not found, skipping update.")
-            except discord.Forbidden:
-                print("Bot does not have permission to edit the message.")
-
-@bot.command()
-async def currenttime(ctx):
+async def push_board(board, pages):
+    """Edits the pages of board that changed, deregistering boards that are gone.
+
+    Continuation messages are sent or deleted when the number of pages
+    changes. Boards removed or parked while the edit was queued are skipped.
+    """
+    if board_registry.get(board.message_id) is not board or board_registry.is_parked(board):
+        return
+    # Edit by id through a partial message; no fetch_message round trip and no channel cache needed
+    channel = bot.get_partial_messageable(board.channel_id, guild_id=board.guild_id)
+    hashes = boards.content_hash(pages)
+    shown = board.content_hash or ()
+    message_ids = [board.message_id, *board.pages]
+    current = board.message_id
+    sent = 0
+    try:
+        for index, page in enumerate(pages):
+            if index == len(message_ids):
+                current = board.message_id  # A missing channel means the whole board is gone
+                message_ids.append((await channel.send(page)).id)
+                board_registry.set_pages(board, message_ids[1:])
+                sent += 1
+            elif index >= len(shown) or shown[index] != hashes[index]:
+                current = message_ids[index]
+                await channel.get_partial_message(current).edit(content=page)
+                sent += 1
+        while len(message_ids) > len(pages):
+            current = message_ids.pop()
+            # Forget the page first, so the deletion event for it is not mistaken for a user's
+            board_registry.set_pages(board, message_ids[1:])
+            await channel.get_partial_message(current).delete()
+            sent += 1
+        board.content_hash = hashes
+    except discord.NotFound:
+        if current == board.message_id:
+            print("Message not found, removing the board.")
+            board_registry.remove(board.message_id)
+        elif board_registry.forget_page(current) is not None:
+            # A deleted continuation page is sent again on the next refresh
+            print("Page not found, it will be sent again.")
+    except discord.Forbidden:
+        # Permissions are per channel, so stop refreshing every board there until they change
+        print(f"Bot does not have permission to edit messages in channel {board.channel_id}, parking its boards.")
+        board_registry.park_channel(board.channel_id, tzengine.now())
+    except discord.HTTPException as e:
+        print(f"Failed to update board {board.message_id}: {e}")
+    finally:
+        tick = rest_stats['last_tick'].get(board.kind)
+        for counters in (rest_stats, tick) if tick else (rest_stats,):
+            counters['sent'] += sent
+            # Every board update used to start with a fetch_message call
+            if sent:
+                counters['fetches_saved'] += 1
+
+def push_cost(board, pages):
+    """Returns how many REST calls push_board makes to show pages on board."""
+    hashes = boards.content_hash(pages)
+    shown = board.content_hash or ()
+    messages = 1 + len(board.pages)
+    edits = sum(1 for index in range(min(len(pages), messages)) if index >= len(shown) or shown[index] != hashes[index])
+    # Pages beyond the board's messages are sent, messages beyond its pages are deleted
+    return edits + abs(len(pages) - messages)
+
+# Delivers board edits within Discord's rate limits
+edit_dispatcher = dispatch.EditDispatcher(push_board, concurrency=EDIT_CONCURRENCY, cost=push_cost)
+
+def refresh_board(board, pages):
+    """Queues pages for board unless they are already shown. Returns True if an edit was queued."""
+    # Only touch Discord when the rendered text actually changed
+    if boards.content_hash(pages) == board.content_hash:
+        return False
+    edit_dispatcher.submit(board, pages)
+    return True
+
+def record_tick(kind, edits, checked):
+    """Records the edits queued, out of the boards checked, by one tick of the refresh loop."""
+    skipped = checked - edits
+    rest_stats['edits'] += edits
+    rest_stats['skipped'] += skipped
+    rest_stats['last_tick'][kind] = {
+        'edits': edits,
+        'skipped': skipped,
+        'skip_ratio': skipped / checked if checked else 0.0,
+        'sent': 0,
+        'fetches_saved': 0,
+    }
+
+def skip_ratio():
+    """Returns the share of board refreshes that needed no edit because the content was unchanged."""
+    checked = rest_stats['edits'] + rest_stats['skipped']
+    return rest_stats['skipped'] / checked if checked else 0.0
+
+async def send_board(ctx, kind, mode, pages, timezones, instant):
+    """Sends every page of a new board and registers it so the refresh loop keeps it up to date."""
+    # Boards are plain channel messages, so slash commands only get a private confirmation
+    await ctx.defer(ephemeral=True)
+    sent_message = await ctx.channel.send(pages[0])
+    continuation = [(await ctx.channel.send(page)).id for page in pages[1:]]
+    if ctx.interaction is not None:
+        await ctx.send("Board created.", ephemeral=True)
+    guild_id = ctx.guild.id if ctx.guild else None
+    board = boards.Board(
+        guild_id, sent_message.channel.id, sent_message.id, kind, mode,
+        content_hash=boards.content_hash(pages), pages=continuation,
+    )
+    board.next_due = render.next_refresh(kind, mode, timezones, instant)
+    return board_registry.add(board, instant)
+
+@bot.hybrid_command()
+@app_commands.choices(mode=MODE_CHOICES)
+async def displaytimezones(ctx, mode: str = render.TEXT_MODE):
+    """Displays the current timezones in the channel and keeps the message updated."""
+    if mode not in render.BOARD_MODES:
+        await ctx.send(f"Unknown mode {mode}. Use one of: {', '.join(render.BOARD_MODES)}.")
+        return
+
+    # Use a single instant for sorting and rendering every row
+    instant = tzengine.now()
+    zones = zone_cache.snapshot(context_list_id(ctx))
+    pages = render.render_board(boards.WORLD_CLOCK, zones, mode, instant)
+
+    # Send the pages and register them for future updates
+    await send_board(ctx, boards.WORLD_CLOCK, mode, pages, zones.rows, instant)
+    await save_boards()
+
+def world_clock_key(board):
+    """Groups world clock boards showing the same zone set in the same mode."""
+    return (zone_cache.snapshot(zone_list_id(board.guild_id, board.channel_id)).fingerprint, board.mode)
+
+def render_world_clock(board, instant):
+    """Renders a world clock board and returns its pages and when they next change."""
+    # The zone list is read from memory; ticks never query SQLite
+    zones = zone_cache.snapshot(zone_list_id(board.guild_id, board.channel_id))
+    pages = render.render_board(board.kind, zones, board.mode, instant)
+    return pages, render.next_refresh(board.kind, board.mode, zones.rows, instant)
+
+@bot.hybrid_command()
+@app_commands.choices(mode=MODE_CHOICES)
+async def currenttime(ctx, mode: str = render.TEXT_MODE):
     """Displays the current timezones in a static message."""
-    message = "```"
-    async with aiosqlite.connect(DATABASE) as db:
-        cursor = await db.execute("SELECT label, timezone FROM timezones")
-        timezones = await cursor.fetchall()
-
-    if timezones:
-        # Sort timezones based on UTC offset
-        timezones.sort(key=lambda x: get_utc_offset(x[1]))
-
-        # Add sorted timezones to the message
-        for label, tz in timezones:
-            tz_info = pytz.timezone(tz)
-            utc_time = datetime.now(pytz.utc)
-            local_time = utc_time.astimezone(tz_info)
-
-            region = label
-            date = local_time.strftime('%m/%d')
-            time = local_time.strftime('%I:%M %p')
-
-            message += f"{region:<20} | {date:<7} | {time}\n"
-        message += "```"
-        await ctx.send(message)
-
-@bot.command()
-async def rsgametime(ctx):
-    """Displays the current Runescape Game Time (RST)."""
-    global rsgame_message_info
-    channel = ctx.channel
-
-    # Create the message content
-    message = "```"
-    tz_info = pytz.timezone('Europe/London')
-    utc_time = datetime.now(pytz.utc)
-    local_time = utc_time.astimezone(tz_info)
+    if mode not in render.BOARD_MODES:
+        await ctx.send(f"Unknown mode {mode}. Use one of: {', '.join(render.BOARD_MODES)}.")
+        return
 
-    # Runescape Game Time is based on London time
-    game_time = local_time.strftime('%H:%M')
+    zones = zone_cache.snapshot(context_list_id(ctx))
+    if not zones.rows:
+        await ctx.send("No timezones are currently tracked.")
+        return
+    for page in render.render_board(boards.WORLD_CLOCK, zones, mode, tzengine.now()):
+        await ctx.send(page)
+
+@bot.hybrid_command()
+@app_commands.choices(mode=MODE_CHOICES)
+async def rsgametime(ctx, mode: str = render.TEXT_MODE):
+    """Displays the current Runescape Game Time (RST) and keeps the message updated."""
+    if mode not in render.BOARD_MODES:
+        await ctx.send(f"Unknown mode {mode}. Use one of: {', '.join(render.BOARD_MODES)}.")
+        return
+
+    instant = tzengine.now()
+    pages = render.render_board(boards.RS_GAME_TIME, None, mode, instant)
+
+    # Send the message and register it for future updates
+    await send_board(ctx, boards.RS_GAME_TIME, mode, pages, (), instant)
+    await save_boards()
+
+def render_rsgame(board, instant):
+    """Renders a Runescape Game Time board and returns its pages and when they next change."""
+    pages = render.render_board(board.kind, None, board.mode, instant)
+    return pages, render.next_refresh(board.kind, board.mode, (), instant)
+
+# Every board type refreshes from the same tick; a new type only needs a subscription here
+tick_bus = ticks.TickBus(board_registry, refresh_board)
+tick_bus.subscribe(boards.WORLD_CLOCK, world_clock_key, render_world_clock)
+tick_bus.subscribe(boards.RS_GAME_TIME, lambda board: board.mode, render_rsgame)
+
+@tasks.loop(seconds=1)
+async def refresh_boards():
+    """Publishes one UTC instant a second and updates the boards whose refresh slot has come."""
+    instant = tzengine.now()
+    board_registry.retry_parked(instant, PARKED_RETRY)
+    results = tick_bus.publish(instant)
+    if not results:
+        return
+    for kind, (edits, checked) in results.items():
+        record_tick(kind, edits, checked)
+
+    # Persist boards dropped during this tick in one batch
+    await save_boards()
+
+async def forget_messages(message_ids):
+    """Drops the boards and pages on deleted messages and saves the removals."""
+    changed = False
+    for message_id in message_ids:
+        if board_registry.remove(message_id) is not None or board_registry.forget_page(message_id) is not None:
+            changed = True
+    if changed:
+        await save_boards()
+
+# Deleted messages are only reported with the message intents (prefix commands, or the default
+# client profile); otherwise a board is dropped by the first edit that finds its message gone
+@bot.event
+async def on_raw_message_delete(payload):
+    """Drops the board on a deleted message."""
+    await forget_messages((payload.message_id,))
 
-    message += f"Runescape Game Time is {game_time}\n"
+@bot.event
+async def on_raw_bulk_message_delete(payload):
+    """Drops the boards on messages deleted in bulk."""
+    await forget_messages(payload.message_ids)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Drops every board in a deleted channel."""
+    if board_registry.remove_channel(channel.id):
+        await save_boards()
+
+@bot.event
+async def on_raw_thread_delete(payload):
+    """Drops every board in a deleted thread."""
+    if board_registry.remove_channel(payload.thread_id):
+        await save_boards()
+
+@bot.event
+async def on_guild_remove(guild):
+    """Drops every board in a guild the bot left or was removed from."""
+    if board_registry.remove_guild(guild.id):
+        await save_boards()
+
+# Parked boards resume when a permission change might have restored the bot's access, and are
+# retried every PARKED_RETRY seconds for changes no event reports, such as the bot's own roles
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Resumes the parked boards of a channel whose settings changed."""
+    board_registry.unpark_channel(after.id, tzengine.now())
+
+@bot.event
+async def on_guild_role_update(before, after):
+    """Resumes the parked boards of a guild whose roles changed."""
+    board_registry.unpark_guild(after.guild.id, tzengine.now())
+
+# Restarts the refresh loop if it fails or stalls
+loop_supervisor = supervisor.Supervisor()
+loop_supervisor.add('refresh_boards', refresh_boards)
+
+@bot.hybrid_command()
+async def worldclockstatus(ctx):
+    """Shows the health of the refresh loop."""
+    now = tzengine.now()
+    message = "```"
+    for name, health in loop_supervisor.health().items():
+        last = f"{now - int(health['last_success'])}s ago" if health['last_success'] else "never"
+        message += f"{name:<20} | {health['state']:<10} | last success {last} | restarts {health['restarts']}\n"
+    message += f"{'boards':<20} | {len(board_registry)} live | {edit_dispatcher.pending()} edits pending\n"
+    message += f"{'refreshes':<20} | {rest_stats['edits']} edited | {rest_stats['skipped']} unchanged | {skip_ratio():.0%} skipped\n"
+    message += f"{'rest calls':<20} | {rest_stats['sent']} sent | {rest_stats['fetches_saved']} fetches saved\n"
+    for kind, tick in rest_stats['last_tick'].items():
+        message += (
+            f"{kind:<20} | last tick {tick['edits']} edited | {tick['skipped']} unchanged | {tick['skip_ratio']:.0%} skipped"
+            f" | {tick['sent']} rest calls sent | {tick['fetches_saved']} fetches saved\n"
+        )
     message += "```"
+    await ctx.send(message)
 
-    # Send the message and store the message_id and channel_id for future updates
-    sent_message = await channel.send(message)
-    rsgame_message_info = {'message_id': sent_message.id, 'channel_id': channel.id}
-
-@tasks.loop(seconds=37)
-async def rsgametime_loop():
-    """Updates the Runescape Game Time message every 15 seconds."""
-    global rsgame_message_info
-
-    # If the message ID is stored, try to update the message
-    if rsgame_message_info.get('message_id') and rsgame_message_info.get('channel_id'):
-        channel = bot.get_channel(rsgame_message_info['channel_id'])
-        if channel:
-            try:
-                message_to_edit = await channel.fetch_message(rsgame_message_info['message_id'])
-                message = "```"
-                tz_info = pytz.timezone('Europe/London')
-                utc_time = datetime.now(pytz.utc)
-                local_time = utc_time.astimezone(tz_info)
-
-                # Runescape Game Time is based on London time
-                game_time = local_time.strftime('%H:%M')
-
-                message += f"Runescape Game Time is {game_time}\n"
-                message += "```"
-
-                # Update the message with the new game time
-                await message_to_edit.edit(content=message)
-
-            except discord.NotFound:
-                print("Message not found, skipping update.")
-            except discord.Forbidden:
-                print("Bot does not have permission to edit the message.")
-
-@bot.command()
+@bot.hybrid_command()
 async def worldclockhelp(ctx):
     """Displays the help message with a list of available commands."""
     help_message = """
     **WorldClock Bot Commands:**
 
-    `!addtimezone [label]` - Adds a new timezone to the list of tracked timezones.
+    `!addtimezone [timezone] [label]` - Adds a timezone (e.g. Europe/London, Tokyo, EST or UTC+5:30) to the list of tracked timezones, optionally shown under a label.
     `!listtimezones` - Lists all currently tracked timezones.
     `!removetimezone [label]` - Removes a timezone from the list of tracked timezones.
-    `!displaytimezones` - Displays the current times of all tracked timezones and updates every 15 seconds.
-    `!currenttime` - Displays the current times of all tracked timezones in a static message.
-    `!rsgametime` - Displays the current Runescape Game Time (RST) and updates every 15 seconds.
+    `!displaytimezones [mode]` - Displays the current times of all tracked timezones and updates every minute.
+    `!currenttime [mode]` - Displays the current times of all tracked timezones in a static message.
+    `!rsgametime [mode]` - Displays the current Runescape Game Time (RST) and updates every minute.
+    `!worldclockstatus` - Shows whether the board refresh loop is healthy and how many board edits it skipped.
+    Use `timestamps` as the mode to show UTC offsets rendered by Discord instead of a clock that is edited every minute.
+    Every command is also available as a slash command, e.g. `/addtimezone`, with timezone suggestions as you type.
     """
     await ctx.send(help_message)
 
-# Run the bot
-bot.run(TOKEN)
\ No newline at end of file
+# Run the bot; importing the module (bot.py, the benchmarks) only sets it up
+if __name__ == "__main__":
+    bot.run(TOKEN)
@@ -0,0 +1,137 @@
+"""Lookup of IANA timezone names and common aliases, for autocomplete and validation.
+
+Every zone is indexed under its full name, its city (the last path
+component, with underscores read as spaces) and any alias, all lowercased
+into one sorted list. A prefix lookup is then a binary search to the first
+matching key and a short scan, which stays in the microseconds however many
+zones there are. resolve() turns what a user typed into the canonical zone
+id that is stored: an exact name, city or alias, a fixed offset such as
+UTC+5:30, or failing those the closest spelling.
+"""
+from bisect import bisect_left
+import difflib
+import pytz
+import tzengine
+
+# Discord shows at most 25 autocomplete choices
+MAX_CHOICES = 25
+
+# How similar a misspelling must be to a known name, city or alias to be accepted (0 to 1)
+FUZZY_CUTOFF = 0.8
+
+# Common abbreviations and names people type instead of an IANA name. Abbreviations that are
+# zones themselves (UTC, GMT, EST, MST, HST, CET, EET, WET) are not listed: they have a fixed
+# offset or rules of their own, which a DST-observing city would silently replace
+ALIASES = {
+    'BST': 'Europe/London',
+    'CEST': 'Europe/Paris',
+    'MSK': 'Europe/Moscow',
+    'IST': 'Asia/Kolkata',
+    'PKT': 'Asia/Karachi',
+    'SGT': 'Asia/Singapore',
+    'HKT': 'Asia/Hong_Kong',
+    'JST': 'Asia/Tokyo',
+    'KST': 'Asia/Seoul',
+    'AEST': 'Australia/Sydney',
+    'AEDT': 'Australia/Sydney',
+    'ACST': 'Australia/Adelaide',
+    'AWST': 'Australia/Perth',
+    'NZST': 'Pacific/Auckland',
+    'AKST': 'America/Anchorage',
+    'PST': 'America/Los_Angeles',
+    'PDT': 'America/Los_Angeles',
+    'Pacific': 'America/Los_Angeles',
+    'MDT': 'America/Denver',
+    'Mountain': 'America/Denver',
+    'CST': 'America/Chicago',
+    'CDT': 'America/Chicago',
+    'Central': 'America/Chicago',
+    'EDT': 'America/New_York',
+    'Eastern': 'America/New_York',
+    'BRT': 'America/Sao_Paulo',
+    # Large cities that are not the namesake of their zone
+    'Mumbai': 'Asia/Kolkata',
+    'Delhi': 'Asia/Kolkata',
+    'Beijing': 'Asia/Shanghai',
+    'San Francisco': 'America/Los_Angeles',
+    'Seattle': 'America/Los_Angeles',
+    'Dallas': 'America/Chicago',
+    'Houston': 'America/Chicago',
+    'Washington': 'America/New_York',
+    'Boston': 'America/New_York',
+    'Miami': 'America/New_York',
+}
+
+def _search_key(text):
+    return text.replace('_', ' ').lower()
+
+class ZoneIndex:
+    """Sorted (key, shown name, zone) entries searched by prefix, plus exact keys for resolving input."""
+
+    def __init__(self, zones, aliases, preferred=()):
+        # An alias never shadows a real zone name
+        names = {_search_key(zone) for zone in zones}
+        aliases = {alias: zone for alias, zone in aliases.items() if _search_key(alias) not in names}
+
+        # Exact keys, from lowest to highest priority: cities of legacy zones, cities of
+        # preferred zones, aliases, then full names
+        preferred = set(preferred)
+        self.exact = {}
+        for zone in sorted(zones, key=lambda zone: zone in preferred):
+            self.exact[_search_key(zone.rsplit('/', 1)[-1])] = zone
+        for alias, zone in aliases.items():
+            self.exact[_search_key(alias)] = zone
+        for zone in zones:
+            self.exact[_search_key(zone)] = zone
+
+        entries = set()
+        for zone in zones:
+            entries.add((_search_key(zone), zone, zone))
+            city = zone.rsplit('/', 1)[-1]
+            if city != zone:
+                entries.add((_search_key(city), zone, zone))
+        for alias, zone in aliases.items():
+            entries.add((_search_key(alias), f"{alias} ({zone})", zone))
+        entries = sorted(entries)
+        self.keys = [key for key, _, _ in entries]
+        self.entries = [(shown, zone) for _, shown, zone in entries]
+
+    def complete(self, prefix, limit=MAX_CHOICES):
+        """Returns up to limit (shown name, zone) pairs whose name, city or alias starts with prefix."""
+        offset = tzengine.parse_fixed_offset(prefix)
+        if offset is not None:
+            name = tzengine.fixed_offset_name(offset)
+            return [(name, name)]
+        prefix = _search_key(prefix.strip())
+        start = bisect_left(self.keys, prefix)
+        matches = {}
+        for index in range(start, len(self.keys)):
+            if len(matches) >= limit or not self.keys[index].startswith(prefix):
+                break
+            shown, zone = self.entries[index]
+            matches.setdefault(shown, zone)
+        return list(matches.items())
+
+    def resolve(self, text):
+        """Returns the canonical zone id for text, or None if nothing matches closely enough."""
+        offset = tzengine.parse_fixed_offset(text)
+        if offset is not None:
+            return tzengine.fixed_offset_name(offset)
+        key = _search_key(text.strip())
+        zone = self.exact.get(key)
+        if zone is None:
+            matches = difflib.get_close_matches(key, self.exact, n=1, cutoff=FUZZY_CUTOFF)
+            if matches:
+                zone = self.exact[matches[0]]
+        return zone
+
+# Built once at import from every zone pytz knows, including legacy links like US/Eastern
+zone_index = ZoneIndex(pytz.all_timezones, ALIASES, preferred=pytz.common_timezones)
+
+def complete(prefix, limit=MAX_CHOICES):
+    """Returns up to limit (shown name, zone) suggestions for a partially typed timezone."""
+    return zone_index.complete(prefix, limit)
+
+def resolve(text):
+    """Returns the canonical zone id for what a user typed, or None if it is not a timezone."""
+    return zone_index.resolve(text)